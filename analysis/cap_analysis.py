@@ -1,43 +1,51 @@
+import threading
+import time
 import numpy as np
-from helpers.utils import parse_float, categorize_market_cap
-from helpers.api_helpers import fetch_data_token
+from helpers.utils import parse_float, parse_float_column
+from helpers.api_helpers import fetch_data_token, token_snapshot_time
+from helpers.token_history import token_history, snapshot_digest
+from helpers.metrics import track_stage
+from config.app_config import TOKEN_HISTORY_WINDOW_TOLERANCE
 
 def winsorize(values, limits=(0.05, 0.05)):
-    """Membatasi nilai ekstrem pada persentil tertentu."""
-    if not values or len(values) < 4:
+    """Membatasi nilai ekstrem pada persentil tertentu.
+
+    Accepts a list or a numpy array and returns the same kind of container.
+    """
+    if values is None or len(values) < 4:
         return values
-    values_array = np.array(values)
+    values_array = np.asarray(values, dtype=np.float64)
     lower = np.percentile(values_array, limits[0] * 100)
     upper = np.percentile(values_array, (1 - limits[1]) * 100)
-    return [min(max(x, lower), upper) for x in values]
+    clipped = np.clip(values_array, lower, upper)
+    return clipped if isinstance(values, np.ndarray) else clipped.tolist()
 
 # *DETECT OUTLIERS
 def detect_outliers(values, method="iqr", threshold=1.5, sensitivity=1.0):
     """Deteksi outlier dengan metode statistik yang lebih robust dan sensitif.
 
     Args:
-        values (list): List nilai yang akan dianalisis
+        values (list | np.ndarray): List nilai yang akan dianalisis
         method (str): "iqr" (Inter-Quartile Range), "zscore", atau "hybrid"
         threshold (float): Batas untuk menentukan outlier (default 1.5 untuk IQR, 2.0 untuk z-score)
         sensitivity (float): Faktor pengali untuk meningkatkan sensitivitas deteksi (default 1.0)
 
     Returns:
-        dict: Dictionary berisi informasi outlier dan nilai-nilai yang dinormalisasi
+        dict: Float64 arrays index-aligned with `values`: "is_outlier" (bool mask
+            of the outliers), "normalized" (0-1 scores) and "ranks" (1 = highest)
     """
-    if not values or len(values) < 4:  # Minimal data untuk analisis statistik
-        return {"outliers": [], "normalized": [0] * len(values), "ranks": [0] * len(values)}
+    if values is None or len(values) < 4:  # Minimal data untuk analisis statistik
+        count = 0 if values is None else len(values)
+        return {"is_outlier": np.zeros(count, dtype=bool), "normalized": np.zeros(count), "ranks": np.zeros(count)}
 
-    values_array = np.array(values)
-    outliers = []
-    normalized = []
+    values_array = np.asarray(values, dtype=np.float64)
+    is_outlier = np.zeros(len(values_array), dtype=bool)
+    normalized = np.zeros(len(values_array))
 
     # Tambahkan ranking untuk mendeteksi token yang relatif lebih tinggi
-    ranks = np.zeros(len(values))
-    if len(values) > 1:  # Pastikan ada cukup data untuk ranking
-        # Buat ranking berdasarkan nilai (1 = tertinggi)
-        temp_ranks = (-values_array).argsort().argsort() + 1
-        # Normalisasi ranking ke 0-1
-        ranks = 1 - (temp_ranks - 1) / (len(values) - 1) if len(values) > 1 else np.ones(len(values))
+    # Buat ranking berdasarkan nilai (1 = tertinggi), lalu normalisasi ke 0-1
+    temp_ranks = (-values_array).argsort().argsort() + 1
+    ranks = 1 - (temp_ranks - 1) / (len(values_array) - 1)
 
     if method == "iqr" or method == "hybrid":
         # Metode IQR (Inter-Quartile Range) dengan sensitivitas yang ditingkatkan
@@ -51,20 +59,17 @@ def detect_outliers(values, method="iqr", threshold=1.5, sensitivity=1.0):
         upper_bound = q3 + adjusted_threshold * iqr
 
         # Identifikasi outlier dengan sensitivitas yang ditingkatkan
-        outliers = [x for x in values if x > upper_bound]
+        is_outlier = values_array > upper_bound
 
         # Normalisasi berdasarkan posisi dalam range dengan kurva eksponensial
-        for val in values:
-            if val <= lower_bound:
-                normalized.append(0.0)
-            elif val >= upper_bound:
-                normalized.append(1.0)
-            else:
-                # Normalisasi non-linear untuk meningkatkan sensitivitas
-                base_norm = (val - lower_bound) / (upper_bound - lower_bound)
-                # Gunakan fungsi eksponensial untuk meningkatkan sensitivitas
-                norm_val = np.power(base_norm, 1/sensitivity)
-                normalized.append(min(1.0, max(0.0, norm_val)))
+        above_lower = values_array > lower_bound
+        at_upper = above_lower & (values_array >= upper_bound)
+        inside = above_lower & (values_array < upper_bound)
+        normalized[at_upper] = 1.0
+
+        # Normalisasi non-linear untuk meningkatkan sensitivitas
+        base_norm = (values_array[inside] - lower_bound) / (upper_bound - lower_bound)
+        normalized[inside] = np.clip(np.power(base_norm, 1 / sensitivity), 0.0, 1.0)
 
     elif method == "zscore":
         # Metode Z-Score dengan sensitivitas yang ditingkatkan
@@ -73,57 +78,133 @@ def detect_outliers(values, method="iqr", threshold=1.5, sensitivity=1.0):
 
         # if std == 0:  # Hindari pembagian dengan nol
         if std <= np.finfo(float).eps:
-            return {"outliers": [], "normalized": [0] * len(values), "ranks": ranks}
+            return {"is_outlier": is_outlier, "normalized": normalized, "ranks": ranks}
 
-        zscores = [(x - mean) / std for x in values]
+        zscores = (values_array - mean) / std
 
         # Identifikasi outlier dengan threshold yang disesuaikan
         adjusted_threshold = threshold / sensitivity
-        outliers = [values[i] for i, z in enumerate(zscores) if z > adjusted_threshold]
+        is_outlier = zscores > adjusted_threshold
 
-        # Normalisasi berdasarkan z-score dengan sensitivitas yang ditingkatkan
-        for z in zscores:
-            if z <= 0:
-                # Nilai di bawah rata-rata mendapat skor rendah
-                norm_val = 0.5 * np.exp(sensitivity * z)
-            else:
-                # Nilai di atas rata-rata mendapat skor tinggi dengan kurva eksponensial
-                norm_val = 0.5 + 0.5 * (1 - np.exp(-sensitivity * z))
-            normalized.append(min(1.0, max(0.0, norm_val)))
+        # Nilai di bawah rata-rata mendapat skor rendah, di atas rata-rata
+        # mendapat skor tinggi dengan kurva eksponensial
+        with np.errstate(over="ignore"):
+            below = 0.5 * np.exp(sensitivity * zscores)
+            above = 0.5 + 0.5 * (1 - np.exp(-sensitivity * zscores))
+        normalized = np.clip(np.where(zscores <= 0, below, above), 0.0, 1.0)
 
     # Jika metode hybrid, gabungkan hasil IQR dan ranking
     if method == "hybrid":
         # Gabungkan normalized dengan ranks untuk hasil akhir
-        # normalized = [0.7 * n + 0.3 * r for n, r in zip(normalized, ranks)]
-        normalized = 0.7 * np.array(normalized) + 0.3 * ranks
+        normalized = 0.7 * normalized + 0.3 * ranks
 
     return {
-        "outliers": outliers,
+        "is_outlier": is_outlier,
         "normalized": normalized,
-        "ranks": list(ranks)
+        "ranks": ranks
     }
 
-# *DETECT EARLY MOMENTUM
-def detect_early_momentum_v2(category_name):
-    """Deteksi token dengan early momentum menggunakan analisis outlier yang ditingkatkan.
-    
+# *COLUMNAR MOMENTUM ENGINE
+MARKET_CAP_CATEGORIES = ("largeCap", "midCap", "smallCap", "microCap")
+
+# Kolom numerik dari sheet Tokens yang dibutuhkan oleh scoring engine
+TOKEN_NUMERIC_COLUMNS = (
+    "Market Cap", "Price", "Circulating Supply", "Total Volume",
+    "Market Cap (Change 24h)", "Price Changes 24h",
+    "Turnover (% Cirulating Supply Traded)", "Hype Activity",
+    "Volatility 24h", "Volatility",
+)
+
+# * Set sensitivity based on market cap category
+SENSITIVITY_MAP = {
+    "largeCap": 1.0,    # Large caps need less sensitivity adjustment
+    "midCap": 1.2,      # Mid caps need moderate sensitivity
+    "smallCap": 1.5,    # Small caps need higher sensitivity
+    "microCap": 2.0     # Micro caps need highest sensitivity
+}
+
+# Category-specific weights for different metrics
+# Use weights because every Market cap category has different characteristics, e.g.:
+# - Large caps are more stable, so we should give less weight to price and volume changes
+# - Small caps are more volatile, so we should give more weight to price and hype
+CATEGORY_WEIGHTS = {
+    "largeCap": {
+        "mcap_chg": 0.25, "turnover": 0.20, "hype": 0.25,
+        "price": 0.10, "volume": 0.10, "volatility": 0.10
+    },
+    "midCap": {
+        "mcap_chg": 0.20, "turnover": 0.20, "hype": 0.30,
+        "price": 0.10, "volume": 0.10, "volatility": 0.10
+    },
+    "smallCap": {
+        "mcap_chg": 0.15, "turnover": 0.20, "hype": 0.30,
+        "price": 0.15, "volume": 0.10, "volatility": 0.10
+    },
+    "microCap": {
+        "mcap_chg": 0.15, "turnover": 0.15, "hype": 0.35,
+        "price": 0.15, "volume": 0.10, "volatility": 0.10
+    }
+}
+DEFAULT_WEIGHTS = {
+    "mcap_chg": 0.20, "turnover": 0.20, "hype": 0.30,
+    "price": 0.10, "volume": 0.10, "volatility": 0.10
+}
+
+# Volatility modifier bands per category: ((lower, upper), modifier), checked in order.
+# The first band is inclusive on both ends, the rest are (lower, upper].
+VOLATILITY_BANDS = {
+    "largeCap": [((2, 10), 0.05), ((10, 20), 0.02), ((20, 40), -0.03), ((40, np.inf), -0.08)],
+    "midCap": [((3, 15), 0.05), ((15, 30), 0.02), ((30, 50), -0.03), ((50, np.inf), -0.07)],
+    "smallCap": [((5, 25), 0.05), ((25, 40), 0.02), ((40, 60), -0.02), ((60, np.inf), -0.06)],
+    "microCap": [((5, 25), 0.05), ((25, 40), 0.02), ((40, 60), -0.02), ((60, np.inf), -0.06)],
+}
+DEFAULT_VOLATILITY_BANDS = [((5, 20), 0.03), ((50, np.inf), -0.07)]
+
+def categorize_market_caps(market_caps):
+    """Vectorized counterpart of `helpers.utils.categorize_market_cap`.
+
     Args:
-        category_name (str): Kategori market cap yang akan dianalisis ("largeCap", "midCap", "smallCap", "microCap")
-        
+        market_caps (np.ndarray): Market cap values
+
     Returns:
-        list: Token dengan early momentum yang sudah diurutkan berdasarkan skor
+        np.ndarray: Category label per value (largeCap, midCap, smallCap, microCap)
     """
-    # TODO===== TAHAP 1: PERSIAPAN DATA =====
-    data = fetch_data_token()
-    if not data or 'values' not in data:
-        print("No valid data available for analysis")
-        return []
+    return np.select(
+        [market_caps > 10_000_000_000, market_caps > 1_000_000_000, market_caps > 100_000_000],
+        ["largeCap", "midCap", "smallCap"],
+        default="microCap"
+    )
+
+def _price_volume_correlation(price_change, volume_change):
+    """Price-volume correlation, neutral default 0.5."""
+    return np.select(
+        [(price_change > 0) & (volume_change > 0), (price_change < 0) & (volume_change < 0)],
+        [1.0, 0.3],
+        default=0.5
+    )
+
+def build_token_columns(values):
+    """Convert the raw `values` matrix of the Tokens sheet into typed columns.
+
+    Every numeric cell is parsed exactly once into float64 column arrays, and
+    the per-token metrics (market cap fallback, category, turnover, hype, VMR,
+    estimated volume change, price-volume correlation and volatility) are
+    derived for all rows at once.
 
-    headers = data["values"][0]
-    rows = data["values"][1:]
-    tokens = []
+    Args:
+        values (list): `values` from `fetch_data_token`, header row first
+
+    Returns:
+        dict: Columnar token snapshot, or None if the matrix has no header
+    """
+    if not values:
+        return None
+
+    headers = values[0]
+    min_length = min(3, len(headers))
+    rows = [row for row in values[1:] if len(row) >= min_length]
 
-    # Map column names to indices for faster access
+    # Map column names to indices (last duplicate header wins, like dict(zip()))
     column_indices = {header: idx for idx, header in enumerate(headers)}
 
     # Check for required columns
@@ -134,400 +215,557 @@ def detect_early_momentum_v2(category_name):
         print(f"Warning: Missing required columns for momentum analysis: {', '.join(missing_columns)}")
         print("Using available columns and estimating missing values.")
 
-    # TODO===== TAHAP 2: EKSTRAKSI DAN KALKULASI METRIK TOKEN =====
-    for row_idx, row in enumerate(rows):
-        try:
-            # Skip rows that are too short
-            if len(row) < min(3, len(headers)):
-                continue
-
-            # Extend row if needed to match headers length
-            if len(row) < len(headers):
-                row = row + [""] * (len(headers) - len(row))
-
-            # Create token data dictionary
-            token_data = dict(zip(headers, row))
-            token_name = token_data.get("Tokens", f"Unknown-{row_idx}")
-
-            # Extract and parse market cap
-            try:
-                market_cap = parse_float(token_data.get("Market Cap", 0))
-                if market_cap <= 0:
-                    # Try to calculate from price and supply if available
-                    price = parse_float(token_data.get("Price", 0))
-                    circ_supply = parse_float(token_data.get("Circulating Supply", 0))
-                    if price > 0 and circ_supply > 0:
-                        market_cap = price * circ_supply
-                        print(f"Calculated market cap for {token_name}: {market_cap}")
-            except Exception as e:
-                print(f"Error processing market cap for {token_name}: {e}")
-                market_cap = 0
-
-            # Determine category
-            category = categorize_market_cap(market_cap)
-
-            # Skip if not in requested category
-            if category != category_name:
-                continue
-
-            # Extract and calculate metrics with robust error handling
-            try:
-                # *TOKEN METRICS
-                volume = parse_float(token_data.get("Total Volume", 0))
-                circ_supply = parse_float(token_data.get("Circulating Supply", 0))
-                mcap_change = parse_float(token_data.get("Market Cap (Change 24h)", 0))
-                price_change = parse_float(token_data.get("Price Changes 24h", 0))
-                
-                # Estimate volume change if not available
-                volume_change = 0
-                if "Total Volume" in token_data and "Market Cap" in token_data:
-                    volume = parse_float(token_data.get("Total Volume", 0))
-                    mcap = parse_float(token_data.get("Market Cap", 0))
-                    if mcap > 0:
-                        # Estimate volume change based on volume/mcap ratio
-                        vmr = volume / mcap * 100
-                        if vmr > 10:
-                            volume_change = 30  # High change
-                        elif vmr > 5:
-                            volume_change = 15  # Medium change
-                        elif vmr > 2:
-                            volume_change = 5   # Low change
-
-                        # If price is up and volume is high, volume likely increased
-                        if price_change > 0 and vmr > 1:
-                            volume_change = max(volume_change, price_change)
-
-                # Calculate turnover (Volume/Circulating Supply)
-                turnover = 0
-                if "Turnover (% Cirulating Supply Traded)" in token_data and token_data["Turnover (% Cirulating Supply Traded)"]:
-                    turnover = parse_float(token_data.get("Turnover (% Cirulating Supply Traded)", 0))
-                elif circ_supply > 0:
-                    turnover = (volume / circ_supply) * 100
-
-                # Log-normalisasi untuk mengatasi perbedaan skala ekstrem
-                if turnover > 0:
-                    turnover = np.log1p(turnover)  # log(1+x) untuk menghindari log(0)
-
-                # Calculate hype activity (Volume/Market Cap)
-                hype_activity = 0
-                if "Hype Activity" in token_data and token_data["Hype Activity"]:
-                    hype_activity = parse_float(token_data.get("Hype Activity", 0))
-                elif market_cap > 0:
-                    hype_activity = (volume / market_cap) * 100
-
-                # VMR is the same as Hype Activity / 100
-                vmr = hype_activity / 100
-
-                # Calculate price-volume correlation
-                price_volume_correlation = 0.5  # Neutral default
-                if price_change > 0 and volume_change > 0:
-                    price_volume_correlation = 1.0  # Positive correlation
-                elif price_change < 0 and volume_change < 0:
-                    price_volume_correlation = 0.3  # Negative correlation
-
-                # Get or estimate volatility
-                volatility = parse_float(token_data.get("Volatility 24h", 0))
-                if volatility == 0:
-                    volatility = parse_float(token_data.get("Volatility", 0))
-                    if volatility == 0 and price_change != 0:
-                        volatility = abs(price_change)
-                    else:
-                        volatility = 1.0
-
-                # Store all metrics in token data
-                token_data["Market Cap"] = market_cap
-                token_data["Market Cap Category"] = category
-                token_data["Turnover"] = turnover
-                token_data["Hype Activity"] = hype_activity
-                token_data["Market Cap (Change 24h)"] = mcap_change
-                token_data["Price Change 24h"] = price_change
-                token_data["Volume Change 24h"] = volume_change
-                token_data["Volatility"] = volatility
-                token_data["VMR"] = vmr
-                token_data["Price-Volume Correlation"] = price_volume_correlation
-
-                tokens.append(token_data)
-
-            except Exception as e:
-                print(f"Error processing metrics for {token_name}: {e}")
-                continue
-
-        except Exception as e:
-            print(f"Error processing row {row_idx}: {e}")
-            continue
-
-    if not tokens:
-        return []
-
-    # TODO===== TAHAP 3: ANALISIS OUTLIER DAN NORMALISASI =====
-    # * Set sensitivity based on market cap category
-    sensitivity_map = {
-        "largeCap": 1.0,    # Large caps need less sensitivity adjustment
-        "midCap": 1.2,      # Mid caps need moderate sensitivity
-        "smallCap": 1.5,    # Small caps need higher sensitivity
-        "microCap": 2.0     # Micro caps need highest sensitivity
-    }
-    sensitivity = sensitivity_map.get(category_name, 1.0)
-
-    # Extract metrics for analysis
-    # Use Max to avoid calculate negative values
-    mcap_changes = [max(0, t["Market Cap (Change 24h)"]) for t in tokens]
-    turnovers = winsorize([t["Turnover"] for t in tokens])
-    hypes = [t["Hype Activity"] for t in tokens]
-    price_changes = [max(0, t.get("Price Change 24h", 0)) for t in tokens]
-    volume_changes = [max(0, t.get("Volume Change 24h", 0)) for t in tokens]
-    volatilities = [t["Volatility"] for t in tokens]
-
-    # Detect outliers and normalize with hybrid method and adjusted sensitivity
-    mcap_analysis = detect_outliers(mcap_changes, method="hybrid", threshold=1.5, sensitivity=sensitivity)
-    turnover_analysis = detect_outliers(turnovers, method="hybrid", threshold=1.5, sensitivity=sensitivity)
-    hype_analysis = detect_outliers(hypes, method="hybrid", threshold=1.5, sensitivity=sensitivity)
-    price_analysis = detect_outliers(price_changes, method="hybrid", threshold=1.5, sensitivity=sensitivity)
-    volume_analysis = detect_outliers(volume_changes, method="hybrid", threshold=1.5, sensitivity=sensitivity)
-    volatility_analysis = detect_outliers(volatilities, method="hybrid", threshold=1.5, sensitivity=sensitivity)
-
-    # TODO===== TAHAP 4: KALKULASI SKOR MOMENTUM =====
-    # Category-specific weights for different metrics
-    # Use weights because every Market cap category has different characteristics, e.g.:
-    # - Large caps are more stable, so we should give less weight to price and volume changes
-    # - Small caps are more volatile, so we should give more weight to price and hype
-    weights = {
-        "largeCap": {
-            "mcap_chg": 0.25, "turnover": 0.20, "hype": 0.25,
-            "price": 0.10, "volume": 0.10, "volatility": 0.10
-        },
-        "midCap": {
-            "mcap_chg": 0.20, "turnover": 0.20, "hype": 0.30,
-            "price": 0.10, "volume": 0.10, "volatility": 0.10
-        },
-        "smallCap": {
-            "mcap_chg": 0.15, "turnover": 0.20, "hype": 0.30,
-            "price": 0.15, "volume": 0.10, "volatility": 0.10
-        },
-        "microCap": {
-            "mcap_chg": 0.15, "turnover": 0.15, "hype": 0.35,
-            "price": 0.15, "volume": 0.10, "volatility": 0.10
-        }
-    }.get(category_name, {
-        "mcap_chg": 0.20, "turnover": 0.20, "hype": 0.30,
-        "price": 0.10, "volume": 0.10, "volatility": 0.10
-    })
-
-    # Calculate raw scores for all tokens
-    raw_scores = []
-    for idx, token in enumerate(tokens):
-        # Base score calculation using normalized values
-        base_score = (
-            weights["mcap_chg"] * mcap_analysis["normalized"][idx] +
-            weights["turnover"] * turnover_analysis["normalized"][idx] +
-            weights["hype"] * hype_analysis["normalized"][idx] +
-            weights["price"] * price_analysis["normalized"][idx] +
-            weights["volume"] * volume_analysis["normalized"][idx] +
-            weights["volatility"] * volatility_analysis["normalized"][idx]
-        )
-
-        # Bonus points for being an outlier
-        # *Can adjust outlier bonus sensitivity
-        outlier_bonus = 0
-        if token["Market Cap (Change 24h)"] in mcap_analysis["outliers"]:
-            outlier_bonus += 0.10
-        if token["Turnover"] in turnover_analysis["outliers"]:
-            outlier_bonus += 0.07
-        if token["Hype Activity"] in hype_analysis["outliers"]:
-            outlier_bonus += 0.07
-
-        # Bonus for high rank in multiple metrics (top 15%)
-        rank_bonus = 0
-        # *Can adjust this threshold
-        top_rank_threshold = 0.85  # Top 15%
-        if mcap_analysis["ranks"][idx] > top_rank_threshold:
-            rank_bonus += 0.03
-        if turnover_analysis["ranks"][idx] > top_rank_threshold:
-            rank_bonus += 0.03
-        if hype_analysis["ranks"][idx] > top_rank_threshold:
-            rank_bonus += 0.03
-
-        # Apply rank bonus with diminishing returns
-        rank_bonus = min(0.10, rank_bonus)
-
-        # Bonus for price-volume correlation
-        correlation_bonus = 0.03 * token["Price-Volume Correlation"]
-
-        # Adjust for volatility with more granular approach and market cap context
-        volatility_modifier = 0
-        volatility = token["Volatility"]
-
-        # Adjust ideal volatility ranges based on market cap category
-        if category_name == "largeCap":
-            # Large caps: reward stability, penalize high volatility
-            if 2 <= volatility <= 10:  # Ideal for large caps
-                volatility_modifier += 0.05
-            elif 10 < volatility <= 20:  # Acceptable
-                volatility_modifier += 0.02
-            elif 20 < volatility <= 40:  # High
-                volatility_modifier -= 0.03
-            elif volatility > 40:  # Extreme
-                volatility_modifier -= 0.08
-        elif category_name == "midCap":
-            # Mid caps: moderate volatility is ideal
-            if 3 <= volatility <= 15:  # Ideal for mid caps
-                volatility_modifier += 0.05
-            elif 15 < volatility <= 30:  # Acceptable
-                volatility_modifier += 0.02
-            elif 30 < volatility <= 50:  # High
-                volatility_modifier -= 0.03
-            elif volatility > 50:  # Extreme
-                volatility_modifier -= 0.07
-        elif category_name in ["smallCap", "microCap"]:
-            # Small/micro caps: higher volatility is expected
-            if 5 <= volatility <= 25:  # Ideal for small caps
-                volatility_modifier += 0.05
-            elif 25 < volatility <= 40:  # Acceptable
-                volatility_modifier += 0.02
-            elif 40 < volatility <= 60:  # High but common
-                volatility_modifier -= 0.02
-            elif volatility > 60:  # Extreme
-                volatility_modifier -= 0.06
+    def column_cells(name):
+        idx = column_indices.get(name)
+        if idx is None:
+            return None
+        return [row[idx] if idx < len(row) else "" for row in rows]
+
+    names = column_cells("Tokens") or [""] * len(rows)
+
+    raw = {}
+    present = {}
+    parse_errors = {}
+    for name in TOKEN_NUMERIC_COLUMNS:
+        cells = column_cells(name)
+        if cells is None:
+            raw[name] = np.zeros(len(rows))
+            present[name] = np.zeros(len(rows), dtype=bool)
         else:
-            # Default case
-            if 5 <= volatility <= 20:  # Ideal range
-                volatility_modifier += 0.03
-            elif volatility > 50:  # Too volatile
-                volatility_modifier -= 0.07
-
-        # Combine all factors for raw score
-        raw_score = base_score + outlier_bonus + rank_bonus + correlation_bonus + volatility_modifier
-
-        # Store raw score and components for later normalization
-        raw_scores.append({
-            "idx": idx,
-            "token": token,
-            "raw_score": raw_score,
-            "base_score": base_score,
-            "outlier_bonus": outlier_bonus,
-            "rank_bonus": rank_bonus,
-            "correlation_bonus": correlation_bonus,
-            "volatility_modifier": volatility_modifier,
-            "is_outlier": (
-                token["Market Cap (Change 24h)"] in mcap_analysis["outliers"] or
-                token["Turnover"] in turnover_analysis["outliers"] or
-                token["Hype Activity"] in hype_analysis["outliers"]
+            raw[name], _, errors = parse_float_column(cells)
+            present[name] = np.array([bool(cell) for cell in cells], dtype=bool)
+            if errors:
+                parse_errors[name] = errors
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # Market cap, calculated from price and supply when missing
+        market_cap = raw["Market Cap"].copy()
+        price = raw["Price"]
+        circ_supply = raw["Circulating Supply"]
+        derived = (market_cap <= 0) & (price > 0) & (circ_supply > 0)
+        market_cap[derived] = price[derived] * circ_supply[derived]
+
+        volume = raw["Total Volume"]
+        price_change = raw["Price Changes 24h"]
+
+        # Estimate volume change based on volume/mcap ratio
+        volume_change = np.zeros(len(rows))
+        if "Total Volume" in column_indices and "Market Cap" in column_indices:
+            sheet_mcap = raw["Market Cap"]
+            has_mcap = sheet_mcap > 0
+            ratio = np.where(has_mcap, volume / sheet_mcap * 100, 0.0)
+            volume_change = np.select(
+                [has_mcap & (ratio > 10), has_mcap & (ratio > 5), has_mcap & (ratio > 2)],
+                [30.0, 15.0, 5.0],
+                default=0.0
             )
-        })
-
-    # TODO===== TAHAP 5: NORMALISASI SKOR AKHIR =====
-    if raw_scores:
-        # Sort by raw score
-        raw_scores.sort(key=lambda x: x["raw_score"], reverse=True)
-
-        # Determine highest and lowest scores
-        max_raw = raw_scores[0]["raw_score"]
-        min_raw = raw_scores[-1]["raw_score"] if len(raw_scores) > 1 else 0
-        score_range = max_raw - min_raw
-
-        # *If range is too small, use sigmoid to expand for better differentiation
-        if score_range < 0.3:
-            for score_data in raw_scores:
-                # Normalize to 0-1 first
-                if score_range > 0:
-                    norm_position = (score_data["raw_score"] - min_raw) / score_range
-                else:
-                    norm_position = 0.5  # Default if all scores are the same
-
-                # Use modified sigmoid function for better distribution
-                final_score = 1 / (1 + np.exp(-10 * (norm_position - 0.5)))
-
-                # Adjust range to 0.2-0.95 to avoid too many 1.0 scores
-                final_score = 0.2 + (final_score * 0.75)
-
-                # Add bonus for top 3 outliers
-                if score_data["is_outlier"] and raw_scores.index(score_data) < 3:
-                    final_score = min(0.98, final_score + 0.05)
-
-                # Save final score
-                score_data["token"]["Early Momentum Score"] = final_score
+            # If price is up and volume is high, volume likely increased
+            rising = has_mcap & (price_change > 0) & (ratio > 1)
+            volume_change = np.where(rising, np.maximum(volume_change, price_change), volume_change)
+
+        # Turnover (Volume/Circulating Supply), log-normalized
+        turnover = np.where(
+            present["Turnover (% Cirulating Supply Traded)"],
+            raw["Turnover (% Cirulating Supply Traded)"],
+            np.where(circ_supply > 0, volume / circ_supply * 100, 0.0)
+        )
+        positive = turnover > 0
+        turnover[positive] = np.log1p(turnover[positive])
+
+        # Hype activity (Volume/Market Cap), VMR is Hype Activity / 100
+        hype_activity = np.where(
+            present["Hype Activity"],
+            raw["Hype Activity"],
+            np.where(market_cap > 0, volume / market_cap * 100, 0.0)
+        )
+        vmr = hype_activity / 100
+
+    correlation = _price_volume_correlation(price_change, volume_change)
+
+    # Volatility 24h, falling back to Volatility, |price change| or 1.0
+    volatility_24h = raw["Volatility 24h"]
+    fallback = np.where((raw["Volatility"] == 0) & (price_change != 0), np.abs(price_change), 1.0)
+    volatility = np.where(volatility_24h == 0, fallback, volatility_24h)
+
+    # Partition rows by market cap category once, for every category scorer
+    category = categorize_market_caps(market_cap)
+    partitions = {name: np.flatnonzero(category == name) for name in MARKET_CAP_CATEGORIES}
+
+    return {
+        "headers": headers,
+        "rows": rows,
+        "names": names,
+        "partitions": partitions,
+        # Malformed cells per column, counted by `parse_float_column`
+        "parse_errors": parse_errors,
+        # Final score per row, filled in by `score_token_columns`
+        "scores": np.full(len(rows), np.nan),
+        "metrics": {
+            "Market Cap": market_cap,
+            "Total Volume": volume,
+            "Turnover": turnover,
+            "Hype Activity": hype_activity,
+            "Market Cap (Change 24h)": raw["Market Cap (Change 24h)"],
+            "Price Change 24h": price_change,
+            "Volume Change 24h": volume_change,
+            "Volatility": volatility,
+            "VMR": vmr,
+            "Price-Volume Correlation": correlation,
+            # Filled in by `apply_token_history` when a previous snapshot is known
+            "Previous Score": np.full(len(rows), np.nan),
+            "Momentum Since": np.full(len(rows), np.nan),
+            "Momentum Days": np.zeros(len(rows)),
+            "Momentum Tracked": np.zeros(len(rows), dtype=bool),
+        },
+    }
+
+def apply_token_history(snapshot, baseline, now, day_baseline=None, coverage_start=None):
+    """Replace estimated deltas with real ones from previously recorded snapshots.
+
+    Volume change becomes the change of Total Volume since `day_baseline` (the
+    snapshot recorded about 24h before `now`), and each token in momentum
+    (positive market cap and price change) carries the time its current
+    momentum started, taken from `baseline` (the previous snapshot). A start is
+    only measured when it happened after `coverage_start`: momentum already
+    running when the history began is flagged as untracked, so its duration is
+    not cut short at the first recorded snapshot. Tokens missing from a
+    baseline keep the estimates.
+
+    Args:
+        snapshot (dict): Result of `build_token_columns`, updated in place
+        baseline (HistorySegment): Previous snapshot, or None
+        now (float): Unix time of `snapshot`
+        day_baseline (HistorySegment): Snapshot of about 24h ago, or None
+        coverage_start (float): Unix time of the oldest recorded snapshot, or None
+    """
+    metrics = snapshot["metrics"]
+    names = snapshot["names"]
+    count = len(names)
+    missing = np.full(count, np.nan)
+    previous = baseline.lookup(names) if baseline is not None else {}
+    known = ~np.isnan(previous.get("Market Cap", missing))
+
+    # Real 24h volume change, the VMR estimate stays for tokens without a 24h baseline
+    day_volume = day_baseline.lookup(names).get("Total Volume", missing) if day_baseline is not None else missing
+    volume_change = metrics["Volume Change 24h"].copy()
+    has_volume = day_volume > 0
+    volume_change[has_volume] = (
+        (metrics["Total Volume"][has_volume] - day_volume[has_volume]) / day_volume[has_volume] * 100
+    )
+    metrics["Volume Change 24h"] = volume_change
+    metrics["Price-Volume Correlation"] = _price_volume_correlation(metrics["Price Change 24h"], volume_change)
+
+    # Momentum start is carried over while the token stays in momentum. A token
+    # seen outside momentum in `baseline` starts now; one never seen before gets
+    # the start of the history, i.e. "at least since then"
+    in_momentum = (metrics["Market Cap (Change 24h)"] > 0) & (metrics["Price Change 24h"] > 0)
+    unseen_start = now if coverage_start is None else coverage_start
+    previous_since = previous.get("Momentum Since", missing)
+    started = np.where(np.isnan(previous_since), np.where(known, now, unseen_start), previous_since)
+    since = np.where(in_momentum, started, np.nan)
+    metrics["Momentum Since"] = since
+    with np.errstate(invalid="ignore"):
+        metrics["Momentum Days"] = np.where(in_momentum & known, np.maximum(1, np.ceil((now - since) / 86400)), 0)
+        tracked = in_momentum & known & (since > coverage_start) if coverage_start is not None else np.zeros(count, dtype=bool)
+    metrics["Momentum Tracked"] = tracked
+    metrics["Previous Score"] = previous.get("Early Momentum Score", missing)
+
+def _volatility_modifier(volatility, category_name):
+    """Vectorized volatility modifier per market cap category."""
+    bands = VOLATILITY_BANDS.get(category_name, DEFAULT_VOLATILITY_BANDS)
+    (first_lower, first_upper), _ = bands[0]
+    conditions = [(volatility >= first_lower) & (volatility <= first_upper)]
+    conditions += [(volatility > lower) & (volatility <= upper) for (lower, upper), _ in bands[1:]]
+    return np.select(conditions, [modifier for _, modifier in bands], default=0.0)
+
+def _final_scores(raw_score, is_outlier):
+    """Map raw scores to final Early Momentum Scores.
+
+    Returns:
+        tuple: (order, final) where `order` ranks indices by raw score
+            (descending, stable) and `final` is index-aligned with `raw_score`
+    """
+    count = len(raw_score)
+    order = np.argsort(-raw_score, kind="stable")
+    sorted_raw = raw_score[order]
+    positions = np.arange(count)
+
+    # Determine highest and lowest scores
+    max_raw = sorted_raw[0]
+    min_raw = sorted_raw[-1] if count > 1 else 0
+    score_range = max_raw - min_raw
+
+    # *If range is too small, use sigmoid to expand for better differentiation
+    if score_range < 0.3:
+        if score_range > 0:
+            norm_position = (sorted_raw - min_raw) / score_range
         else:
-            # *If range is already large enough, use rank-based normalization
-            for i, score_data in enumerate(raw_scores):
-                # Top tokens get fixed high scores
-                if i == 0:  # Top token
-                    final_score = 0.95
-                elif i == 1:  # Second token
-                    final_score = 0.92
-                elif i == 2:  # Third token
-                    final_score = 0.89
-                elif i < len(raw_scores) * 0.1:  # Top 10%
-                    final_score = 0.85 - (i * 0.01)
-                else:
-                    # Rest use rank-based normalization with upper limit
-                    rank_position = i / len(raw_scores)
-                    final_score = max(0.2, 0.8 - (rank_position * 0.6))
-
-                # Save final score
-                score_data["token"]["Early Momentum Score"] = final_score
-
-        # TODO===== TAHAP 6: SIMPAN KOMPONEN SKOR DAN METADATA =====
-        for score_data in raw_scores:
-            token = score_data["token"]
-            idx = score_data["idx"]
-
-            # Save all score components
-            token["MCAP Score"] = mcap_analysis["normalized"][idx]
-            token["Turnover Score"] = turnover_analysis["normalized"][idx]
-            token["Hype Score"] = hype_analysis["normalized"][idx]
-            token["Price Score"] = price_analysis["normalized"][idx]
-            token["Volume Score"] = volume_analysis["normalized"][idx]
-            token["Volatility Score"] = volatility_analysis["normalized"][idx]
-            
-            # Tambahkan estimasi momentum duration menggunakan data 7d
-            token["Momentum Duration"] = estimate_momentum_duration(token)
-            
-            # Tambahkan klasifikasi momentum berdasarkan durasi dan skor
-            score = token["Early Momentum Score"]
-            duration = token["Momentum Duration"]
-            
-            # Klasifikasi momentum berdasarkan kombinasi skor dan durasi
-            if score >= 0.8:
-                if duration <= 2:
-                    token["Momentum Type"] = "New Strong"  # Momentum baru dan kuat
-                else:
-                    token["Momentum Type"] = "Established Strong"  # Momentum kuat berkelanjutan
-            elif score >= 0.6:
-                if duration <= 2:
-                    token["Momentum Type"] = "New Moderate"  # Momentum baru moderat
-                else:
-                    token["Momentum Type"] = "Established Moderate"  # Momentum moderat berkelanjutan
-            else:
-                if duration <= 2:
-                    token["Momentum Type"] = "Emerging"  # Momentum baru tapi lemah
-                else:
-                    token["Momentum Type"] = "Fading"  # Momentum yang melemah
-            
-            token["Base Score"] = score_data["base_score"]
-            token["Outlier Bonus"] = score_data["outlier_bonus"]
-            token["Rank Bonus"] = score_data["rank_bonus"]
-            token["Raw Score"] = score_data["raw_score"]
-            token["Is Outlier"] = score_data["is_outlier"]
-
-            # Determine momentum strength category
-            if score >= 0.8:
-                token["Momentum Strength"] = "Very Strong"
-            elif score >= 0.7:
-                token["Momentum Strength"] = "Strong"
-            elif score >= 0.5:
-                token["Momentum Strength"] = "Moderate"
-            elif score >= 0.3:
-                token["Momentum Strength"] = "Weak"
-            else:
-                token["Momentum Strength"] = "Very Weak"
+            norm_position = np.full(count, 0.5)  # Default if all scores are the same
+
+        # Use modified sigmoid function, adjusted to 0.2-0.95 to avoid too many 1.0 scores
+        sorted_final = 1 / (1 + np.exp(-10 * (norm_position - 0.5)))
+        sorted_final = 0.2 + (sorted_final * 0.75)
+
+        # Add bonus for top 3 outliers
+        top_outliers = is_outlier[order] & (positions < 3)
+        sorted_final = np.where(top_outliers, np.minimum(0.98, sorted_final + 0.05), sorted_final)
+    else:
+        # *If range is already large enough, use rank-based normalization
+        sorted_final = np.where(
+            positions < count * 0.1,
+            0.85 - (positions * 0.01),  # Top 10%
+            np.maximum(0.2, 0.8 - ((positions / count) * 0.6))
+        )
+        # Top tokens get fixed high scores
+        sorted_final[:3] = [0.95, 0.92, 0.89][:min(3, count)]
+
+    final = np.empty(count)
+    final[order] = sorted_final
+    return order, final
 
-    # TODO===== TAHAP 7: FILTER DAN URUTKAN HASIL =====
+def score_token_columns(snapshot, category_name):
+    """Score one market cap category of a columnar token snapshot.
+
+    Args:
+        snapshot (dict): Result of `build_token_columns`
+        category_name (str): "largeCap", "midCap", "smallCap" or "microCap"
+
+    Returns:
+        RankedTokens: Tokens with early momentum, ranked by score (highest first)
+    """
+    if not snapshot:
+        return RankedTokens.empty(category_name)
+
+    selected = snapshot["partitions"].get(category_name)
+    if selected is None or len(selected) == 0:
+        return RankedTokens.empty(category_name)
+
+    metrics = {name: column[selected] for name, column in snapshot["metrics"].items()}
+    sensitivity = SENSITIVITY_MAP.get(category_name, 1.0)
+    weights = CATEGORY_WEIGHTS.get(category_name, DEFAULT_WEIGHTS)
+
+    # TODO===== ANALISIS OUTLIER DAN NORMALISASI =====
+    # Use positive part to avoid calculate negative values
+    mcap_change = metrics["Market Cap (Change 24h)"]
+    turnover = metrics["Turnover"]
+    hype = metrics["Hype Activity"]
+    price_change = metrics["Price Change 24h"]
+
+    analyses = {
+        "mcap_chg": detect_outliers(np.where(mcap_change > 0, mcap_change, 0.0), method="hybrid", threshold=1.5, sensitivity=sensitivity),
+        "turnover": detect_outliers(winsorize(turnover), method="hybrid", threshold=1.5, sensitivity=sensitivity),
+        "hype": detect_outliers(hype, method="hybrid", threshold=1.5, sensitivity=sensitivity),
+        "price": detect_outliers(np.where(price_change > 0, price_change, 0.0), method="hybrid", threshold=1.5, sensitivity=sensitivity),
+        "volume": detect_outliers(np.maximum(metrics["Volume Change 24h"], 0.0), method="hybrid", threshold=1.5, sensitivity=sensitivity),
+        "volatility": detect_outliers(metrics["Volatility"], method="hybrid", threshold=1.5, sensitivity=sensitivity),
+    }
+    normalized = {key: analysis["normalized"] for key, analysis in analyses.items()}
+    ranks = {key: analysis["ranks"] for key, analysis in analyses.items()}
+
+    # TODO===== KALKULASI SKOR MOMENTUM =====
+    base_score = (
+        weights["mcap_chg"] * normalized["mcap_chg"] +
+        weights["turnover"] * normalized["turnover"] +
+        weights["hype"] * normalized["hype"] +
+        weights["price"] * normalized["price"] +
+        weights["volume"] * normalized["volume"] +
+        weights["volatility"] * normalized["volatility"]
+    )
+
+    # Bonus points for being an outlier, flagged by position in the analyzed column
+    # *Can adjust outlier bonus sensitivity
+    mcap_outlier = analyses["mcap_chg"]["is_outlier"]
+    turnover_outlier = analyses["turnover"]["is_outlier"]
+    hype_outlier = analyses["hype"]["is_outlier"]
+    outlier_bonus = (
+        0
+        + np.where(mcap_outlier, 0.10, 0.0)
+        + np.where(turnover_outlier, 0.07, 0.0)
+        + np.where(hype_outlier, 0.07, 0.0)
+    )
+    is_outlier = mcap_outlier | turnover_outlier | hype_outlier
+
+    # Bonus for high rank in multiple metrics (top 15%), with diminishing returns
+    # *Can adjust this threshold
+    top_rank_threshold = 0.85
+    rank_bonus = (
+        0
+        + np.where(ranks["mcap_chg"] > top_rank_threshold, 0.03, 0.0)
+        + np.where(ranks["turnover"] > top_rank_threshold, 0.03, 0.0)
+        + np.where(ranks["hype"] > top_rank_threshold, 0.03, 0.0)
+    )
+    rank_bonus = np.minimum(0.10, rank_bonus)
+
+    # Bonus for price-volume correlation
+    correlation_bonus = 0.03 * metrics["Price-Volume Correlation"]
+
+    # Adjust for volatility with market cap context
+    volatility_modifier = _volatility_modifier(metrics["Volatility"], category_name)
+
+    # Combine all factors for raw score
+    raw_score = base_score + outlier_bonus + rank_bonus + correlation_bonus + volatility_modifier
+
+    # TODO===== NORMALISASI SKOR AKHIR =====
+    _, final_score = _final_scores(raw_score, is_outlier)
+    snapshot["scores"][selected] = final_score
+
+    # TODO===== FILTER DAN URUTKAN HASIL =====
     # Filter tokens with positive MCAP change and minimum momentum score
     min_score_threshold = 0.15  # Minimum score to be considered for early momentum
-    filtered_tokens = [t for t in tokens if t["Market Cap (Change 24h)"] > 0 and t["Price Change 24h"] > 0 and t["Early Momentum Score"] >= min_score_threshold]
+    keep = np.flatnonzero((mcap_change > 0) & (price_change > 0) & (final_score >= min_score_threshold))
 
-    # Sort by momentum score
-    return sorted(filtered_tokens, key=lambda x: x["Early Momentum Score"], reverse=True)
+    components = {
+        "Base Score": base_score,
+        "Outlier Bonus": outlier_bonus,
+        "Rank Bonus": rank_bonus,
+        "Raw Score": raw_score,
+    }
+
+    # Ranked lazily: only the pages that are shown get sorted and materialized
+    return RankedTokens(
+        category_name, keep, final_score[keep],
+        lambda pos: _build_token(snapshot, selected[pos], category_name, metrics, normalized, components, final_score, is_outlier, pos),
+        data_at=snapshot.get("loaded_at"), snapshot_id=snapshot.get("digest")
+    )
+
+def _build_token(snapshot, row_pos, category_name, metrics, normalized, components, final_score, is_outlier, pos):
+    """Materialize the token dict for one scored row."""
+    headers = snapshot["headers"]
+    row = snapshot["rows"][row_pos]
+
+    # Extend row if needed to match headers length
+    if len(row) < len(headers):
+        row = row + [""] * (len(headers) - len(row))
+    token = dict(zip(headers, row))
+
+    # Store all metrics in token data
+    token["Market Cap"] = float(metrics["Market Cap"][pos])
+    token["Market Cap Category"] = category_name
+    for name in ("Turnover", "Hype Activity", "Market Cap (Change 24h)", "Price Change 24h",
+                 "Volume Change 24h", "Volatility", "VMR", "Price-Volume Correlation"):
+        token[name] = float(metrics[name][pos])
+
+    score = float(final_score[pos])
+    token["Early Momentum Score"] = score
+
+    # Save all score components
+    token["MCAP Score"] = normalized["mcap_chg"][pos]
+    token["Turnover Score"] = normalized["turnover"][pos]
+    token["Hype Score"] = normalized["hype"][pos]
+    token["Price Score"] = normalized["price"][pos]
+    token["Volume Score"] = normalized["volume"][pos]
+    token["Volatility Score"] = normalized["volatility"][pos]
+
+    # Score change since the previous recorded snapshot (None without history)
+    previous_score = metrics["Previous Score"][pos]
+    token["Score Change"] = None if np.isnan(previous_score) else score - float(previous_score)
+
+    # Momentum duration from history when its start was recorded, otherwise
+    # estimated from the 7d data (the recorded days are then only a lower bound)
+    momentum_days = int(metrics["Momentum Days"][pos])
+    if metrics["Momentum Tracked"][pos]:
+        token["Momentum Duration"] = momentum_days
+    else:
+        token["Momentum Duration"] = max(momentum_days, estimate_momentum_duration(token))
+    duration = token["Momentum Duration"]
+
+    # Klasifikasi momentum berdasarkan kombinasi skor dan durasi
+    if score >= 0.8:
+        token["Momentum Type"] = "New Strong" if duration <= 2 else "Established Strong"
+    elif score >= 0.6:
+        token["Momentum Type"] = "New Moderate" if duration <= 2 else "Established Moderate"
+    else:
+        token["Momentum Type"] = "Emerging" if duration <= 2 else "Fading"
+
+    token["Base Score"] = float(components["Base Score"][pos])
+    token["Outlier Bonus"] = float(components["Outlier Bonus"][pos])
+    token["Rank Bonus"] = float(components["Rank Bonus"][pos])
+    token["Raw Score"] = float(components["Raw Score"][pos])
+    token["Is Outlier"] = bool(is_outlier[pos])
+
+    # Determine momentum strength category
+    if score >= 0.8:
+        token["Momentum Strength"] = "Very Strong"
+    elif score >= 0.7:
+        token["Momentum Strength"] = "Strong"
+    elif score >= 0.5:
+        token["Momentum Strength"] = "Moderate"
+    elif score >= 0.3:
+        token["Momentum Strength"] = "Weak"
+    else:
+        token["Momentum Strength"] = "Very Weak"
+
+    return token
+
+# *RANKED RESULTS
+class RankedTokens:
+    """
+    Scored tokens of one category, ranked by score (highest first, ties by row).
+
+    Only the ranks that are actually read get sorted: the first K ranks are
+    selected with a partial partition plus a sort of those K rows, and token
+    dicts are materialized (once) for the ranks that are read. Pages beyond the
+    first are served from the same ranking without rescoring.
+
+    Supports `len()`, iteration and indexing/slicing like the list it replaces.
+
+    Args:
+        category_name (str): Market cap category
+        candidates (np.ndarray): Row positions of the ranked tokens
+        scores (np.ndarray): Final score of each candidate
+        build_token (callable): Maps a candidate position to its token dict
+        data_at (float): Unix time the scored sheet snapshot was loaded
+            (default: now)
+        snapshot_id (str): `snapshot_digest` of the scored sheet, rankings of
+            the same sheet data share it
+    """
+
+    def __init__(self, category_name, candidates, scores, build_token, data_at=None, snapshot_id=None):
+        self.category_name = category_name
+        self.created_at = time.time()
+        self.data_at = self.created_at if data_at is None else data_at
+        self.snapshot_id = snapshot_id
+        self._candidates = np.asarray(candidates)
+        self._scores = np.asarray(scores, dtype=np.float64)
+        self._build_token = build_token
+        self._order = np.empty(0, dtype=np.intp)
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def empty(cls, category_name):
+        return cls(category_name, np.empty(0, dtype=np.intp), np.empty(0), None)
+
+    def __len__(self):
+        return len(self._candidates)
+
+    def __iter__(self):
+        return iter(self.top(len(self)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            ranks = range(len(self))[index]
+            if not ranks:
+                return []
+            tokens = self.top(max(ranks) + 1)
+            return [tokens[rank] for rank in ranks]
+        rank = range(len(self))[index]
+        return self.top(rank + 1)[rank]
+
+    def _ranking(self, k):
+        """Candidate indices of the first `k` ranks, extending the sorted prefix as needed."""
+        count = len(self._candidates)
+        k = max(0, min(k, count))
+        if len(self._order) < k:
+            negated = -self._scores
+            if k < count:
+                # Every candidate that can reach the top k (boundary ties included),
+                # in row order so the stable sort breaks ties like a full sort
+                kth = np.partition(negated, k - 1)[k - 1]
+                pool = np.flatnonzero(negated <= kth)
+                order = pool[np.argsort(negated[pool], kind="stable")][:k]
+            else:
+                order = np.argsort(negated, kind="stable")
+            with self._lock:
+                if len(self._order) < k:
+                    self._order = order
+        return self._order[:k]
+
+    def top(self, k):
+        """Token dicts of the first `k` ranks."""
+        tokens = []
+        for index in self._ranking(k):
+            token = self._tokens.get(index)
+            if token is None:
+                token = self._tokens.setdefault(index, self._build_token(self._candidates[index]))
+            tokens.append(token)
+        return tokens
+
+    def page(self, cursor=0, size=15):
+        """
+        One page of the ranking
+
+        Args:
+            cursor (int): Rank offset of the page (0 = first page)
+            size (int): Tokens per page
+
+        Returns:
+            tuple: (tokens, next_cursor) where next_cursor is None on the last page
+        """
+        cursor = max(0, int(cursor))
+        end = min(cursor + size, len(self))
+        tokens = self.top(end)[cursor:end]
+        return tokens, (end if end < len(self) else None)
+
+# *DETECT EARLY MOMENTUM (ALL CATEGORIES)
+def detect_early_momentum_all(categories=MARKET_CAP_CATEGORIES, fresh=False):
+    """Deteksi early momentum untuk beberapa kategori dari satu snapshot data.
+
+    The Tokens sheet is fetched and parsed once, partitioned by market cap
+    category, and every requested category is scored from that snapshot.
+    Volume change is taken against the snapshot recorded about 24h earlier and
+    momentum starts against the previous one in the token history, and
+    the snapshot is recorded there (with the scores of all categories) once
+    per `TOKEN_HISTORY_INTERVAL`.
+
+    Args:
+        categories (iterable): Kategori market cap yang akan dianalisis
+        fresh (bool): Reload the sheet from upstream instead of accepting a
+            stale cached snapshot
+
+    Returns:
+        dict: Mapping kategori -> RankedTokens (diurutkan berdasarkan skor)
+    """
+    with track_stage("momentum", "fetch_data"):
+        data = fetch_data_token(fresh=True) if fresh else fetch_data_token()
+    if not data or 'values' not in data:
+        print("No valid data available for analysis")
+        return {category: RankedTokens.empty(category) for category in categories}
+
+    with track_stage("momentum", "parse_columns"):
+        snapshot = build_token_columns(data["values"])
+    if not snapshot:
+        return {category: RankedTokens.empty(category) for category in categories}
+
+    now = time.time()
+    snapshot["loaded_at"] = token_snapshot_time() or now
+    metrics = snapshot["metrics"]
+    with track_stage("momentum", "history_lookup"):
+        digest = snapshot["digest"] = snapshot_digest(snapshot["names"], metrics["Market Cap"], metrics["Total Volume"])
+        apply_token_history(
+            snapshot, token_history.baseline(digest), now,
+            day_baseline=token_history.segment_near(now - 86400, TOKEN_HISTORY_WINDOW_TOLERANCE),
+            coverage_start=token_history.coverage_start(),
+        )
+
+    with track_stage("momentum", "score"):
+        result = {category: score_token_columns(snapshot, category) for category in categories}
+
+    if token_history.is_due(digest, now):
+        with track_stage("momentum", "history_record"):
+            for category in MARKET_CAP_CATEGORIES:
+                if category not in result:
+                    score_token_columns(snapshot, category)
+            token_history.append(snapshot["names"], {
+                "Market Cap": metrics["Market Cap"],
+                "Total Volume": metrics["Total Volume"],
+                "Early Momentum Score": snapshot["scores"],
+                "Momentum Since": metrics["Momentum Since"],
+            }, digest, now)
+
+    return result
+
+# *DETECT EARLY MOMENTUM
+def detect_early_momentum_v2(category_name):
+    """Deteksi token dengan early momentum menggunakan analisis outlier yang ditingkatkan.
+
+    Args:
+        category_name (str): Kategori market cap yang akan dianalisis ("largeCap", "midCap", "smallCap", "microCap")
+
+    Returns:
+        RankedTokens: Token dengan early momentum yang sudah diurutkan berdasarkan skor
+    """
+    return detect_early_momentum_all((category_name,))[category_name]
 
 def estimate_momentum_duration(token):
     """
@@ -1,28 +1,36 @@
-from helpers.api_helpers import fetch_financialjuice_feed, get_gemini_response_v2, fetch_calendar_economy
+from helpers.api_helpers import (
+    fetch_financialjuice_feed, get_gemini_response_v2, fetch_calendar_economy,
+    fetch_concurrently, fetch_concurrently_async
+)
 from datetime import datetime
+import asyncio
+import contextvars
 import re
-from config.app_config import logger
-
-# TODO* CLASSIFY AND FORMAT NEWS
-def classify_and_format_news(feed):
-
-    us_keywords = [
+import threading
+from config.app_config import logger, MACRO_FETCH_TIMEOUT
+from helpers.gemini_client import is_error_response
+from helpers.response_cache import llm_response_cache, make_cache_key, normalize_question
+from helpers.single_flight import command_flights
+from helpers.metrics import track_stage
+
+# TODO* NEWS KEYWORD SETS
+US_KEYWORDS = [
     "fed", "fomc", "pce", "cpi", "ppi", "core inflation", "rate hike", "rate cut",
     "dot plot", "tightening", "easing", "nfp", "nonfarm", "jobless claims", "jolts",
     "payroll", "unemployment", "employment", "labor market", "treasury", "bond yields",
     "yields", "bonds", "dollar", "usd", "fiscal", "government shutdown", "budget deal",
     "retail sales", "consumer confidence", "ism", "pmi", "gdp", "gdi", "spending",
     "biden", "trump", "white house", "congress", "debt ceiling", "fiscal policy"
-    ]
+]
 
-    china_keywords = [
+CHINA_KEYWORDS = [
     "china", "beijing", "xi jinping", "li qiang", "pboe", "pboc", "stimulus",
     "real estate", "property sector", "property crisis", "evergrande", "country garden",
     "local government debt", "shadow banking", "yuan", "soes", "manufacturing", "exports",
     "economic support", "infrastructure boost", "liquidity support"
-    ]
+]
 
-    global_keywords = [
+GLOBAL_KEYWORDS = [
     "ecb", "europe", "eurozone", "boe", "boj", "boc", "rba", "rbnz",
     "germany", "france", "uk", "japan", "canada", "australia", "new zealand", "switzerland",
     "turkey", "singapore", "inflation", "disinflation", "deflation",
@@ -30,62 +38,141 @@ def classify_and_format_news(feed):
     "opec", "oil", "crude", "energy prices", "supply shock", "commodity", "brent", "conflict",
     "tensions", "ceasefire", "war", "missile", "gaza", "hezbollah", "houthis", "yemen",
     "eur", "gbp", "jpy", "cad", "aud", "nzd", "chf"
-    ]
+]
 
-    us_locations = [
+US_LOCATIONS = [
     "united states", "us", "america", "usa", "washington", "new york", "fed", "fomc", "yellen",
     "biden", "trump", "white house", "congress"
-    ]
-    china_locations = [
+]
+CHINA_LOCATIONS = [
     "china", "beijing", "shanghai", "xi jinping", "pboe", "pboc", "chinese"
-    ]
-    global_locations = [
+]
+GLOBAL_LOCATIONS = [
     "europe", "germany", "france", "uk", "england", "london",
     "japan", "tokyo", "canada", "ottawa", "australia", "sydney", "new zealand",
     "switzerland", "zurich", "turkey", "ankara", "singapore", "opec",
     "middle east", "iran", "israel", "russia", "ukraine", "saudi", "gaza", "hezbollah", "yemen", "swiss", "turkish"
-    ]
+]
+
+NEWS_KEYWORD_SETS = {
+    "us": US_KEYWORDS,
+    "china": CHINA_KEYWORDS,
+    "global": GLOBAL_KEYWORDS,
+    "us_location": US_LOCATIONS,
+    "china_location": CHINA_LOCATIONS,
+    "global_location": GLOBAL_LOCATIONS,
+}
+
+
+# TODO* KEYWORD MATCHER (compiled once)
+_WORD_PATTERN = re.compile(r'\w+')
+
+def build_keyword_matcher(keyword_sets):
+    """Compile all keyword sets into one keyword table keyed by first word.
+
+    Every keyword is stored once, together with the names of all sets it
+    belongs to ("fed" -> {"us", "us_location"}). Matching a title is then a
+    single scan over its words instead of one regex search per set.
+    """
+    keyword_tags = {}
+    for tag, keywords in keyword_sets.items():
+        for keyword in keywords:
+            keyword_tags.setdefault(keyword.lower(), set()).add(tag)
+
+    keywords_by_first_word = {}
+    for keyword, tags in keyword_tags.items():
+        first_word = _WORD_PATTERN.match(keyword).group()
+        is_phrase = keyword != first_word
+        keywords_by_first_word.setdefault(first_word, []).append((keyword, is_phrase, frozenset(tags)))
+    return keywords_by_first_word
+
+
+_keywords_by_first_word = build_keyword_matcher(NEWS_KEYWORD_SETS)
+
+def match_keyword_sets(title):
+    """Return the names of every keyword set that has a hit in `title` (one scan)."""
+    lowered = title.lower()
+    hits = set()
+
+    for word in _WORD_PATTERN.finditer(lowered):
+        candidates = _keywords_by_first_word.get(word.group())
+        if not candidates:
+            continue
+        for keyword, is_phrase, tags in candidates:
+            if is_phrase:
+                # Multi-word keyword: the rest of the phrase must follow and end on a word boundary
+                end = word.start() + len(keyword)
+                if not lowered.startswith(keyword, word.start()) or _WORD_PATTERN.match(lowered, end):
+                    continue
+            hits |= tags
+
+    return hits
+
+
+# TODO* CLASSIFY NEWS TITLES
+def classify_news_titles(titles):
+    """Return the bucket ("us", "china" or "global") of every headline title."""
+    buckets = []
+
+    for title in titles:
+        hits = match_keyword_sets(title)
+
+        if "us" in hits and "us_location" in hits:
+            buckets.append("us")
+        elif "china" in hits and "china_location" in hits:
+            buckets.append("china")
+        elif "global" in hits and "global_location" in hits:
+            buckets.append("global")
+        elif "us_location" in hits:
+            buckets.append("us")
+        elif "china_location" in hits:
+            buckets.append("china")
+        else:
+            buckets.append("global")
 
-    def build_pattern(keywords):
-        return re.compile(r'\b(' + '|'.join(map(re.escape, keywords)) + r')\b', re.IGNORECASE)
+    return buckets
 
 
-    us_pattern = build_pattern(us_keywords)
-    china_pattern = build_pattern(china_keywords)
-    global_pattern = build_pattern(global_keywords)
-    
-    us_location_pattern = build_pattern(us_locations)
-    china_location_pattern = build_pattern(china_locations)
-    global_location_pattern = build_pattern(global_locations)
+# TODO* CLASSIFY AND FORMAT NEWS (INCREMENTAL)
+# Classification per feed item, keyed by GUID (or link). Only items not seen in
+# a previous call are classified; items that left the feed window are evicted.
+_news_item_cache = {}
+_news_item_cache_lock = threading.Lock()
 
-    us_news, china_news, global_news = [], [], []
+def _news_item_key(item):
+    return item.get('guid') or item.get('link') or item.get('title', '')
 
+def classify_and_format_news(feed):
+    entries = []
     for item in feed.get('items', []):
         title = item.get('title', '').removeprefix('FinancialJuice: ').strip()
         published = item.get('pubDate', '')
-        formatted_title = f"• {title} ({published})"
-       
-        is_us = us_pattern.search(title)
-        is_china = china_pattern.search(title)
-        is_global = global_pattern.search(title)
-
-        if is_us and us_location_pattern.search(title):
-            us_news.append(formatted_title)
-        elif is_china and china_location_pattern.search(title):
-            china_news.append(formatted_title)
-        elif is_global and global_location_pattern.search(title):
-            global_news.append(formatted_title)
-        else:
-            if us_location_pattern.search(title):
-                us_news.append(formatted_title)
-            elif china_location_pattern.search(title):
-                china_news.append(formatted_title)
-            elif global_location_pattern.search(title):
-                global_news.append(formatted_title)
-            else:
-                global_news.append(formatted_title)
+        entries.append((_news_item_key(item), title, published))
+
+    with _news_item_cache_lock:
+        cached = {key: _news_item_cache.get(key) for key, _, _ in entries}
+
+    # Classify only new (or edited) items
+    unseen = [
+        (key, title, published) for key, title, published in entries
+        if cached[key] is None or cached[key][0] != (title, published)
+    ]
+    if unseen:
+        buckets = classify_news_titles([title for _, title, _ in unseen])
+        for (key, title, published), bucket in zip(unseen, buckets):
+            cached[key] = ((title, published), bucket, f"• {title} ({published})")
+
+    with _news_item_cache_lock:
+        # Keep only the items of the current feed window
+        _news_item_cache.clear()
+        _news_item_cache.update(cached)
+
+    news = {"us": [], "china": [], "global": []}
+    for key, _, _ in entries:
+        _, bucket, formatted_title = cached[key]
+        news[bucket].append(formatted_title)
 
-    return us_news, china_news, global_news
+    return news["us"], news["china"], news["global"]
 
 
 # TODO* GENERATE MACRO PROMPT
@@ -163,8 +250,9 @@ Respond only with the formatted analysis or the fallback message. No extra comme
 
 # TODO* FILTER CALENDAR ECONOMY DATA
 def filtered_calendar_economy():
-    calendar_data = fetch_calendar_economy()
+    return format_calendar_economy(fetch_calendar_economy())
 
+def format_calendar_economy(calendar_data):
     if calendar_data is None:
         return "Error: Failed to fetch calendar economy data, try again later..."
 
@@ -203,32 +291,82 @@ def filtered_calendar_economy():
     return calendar_news
 
 # TODO* ANALYZE MACRO NEWS
-def analyze_macro_news(user_query: str = None):
+# The feed and the calendar are fetched concurrently under one deadline
+MACRO_INPUTS = {"feed": fetch_financialjuice_feed, "calendar": fetch_calendar_economy}
+
+def macro_flight_key(user_query):
+    """Single-flight key of a /macro question, concurrent identical questions share one analysis."""
+    return make_cache_key("macro", normalize_question(user_query))
+
+def analyze_macro_news(user_query: str = None, on_chunk=None):
+    def analyze(on_chunk):
+        with track_stage("macro", "fetch_inputs"):
+            inputs = fetch_concurrently(MACRO_INPUTS, MACRO_FETCH_TIMEOUT)
+        return analyze_macro_inputs(inputs["feed"], inputs["calendar"], user_query, on_chunk)
+
     try:
-        raw_news = fetch_financialjuice_feed()
+        return command_flights.do(macro_flight_key(user_query), analyze, on_chunk)
+    except Exception as e:
+        logger.error(f"Error in analyze_macro_news: {e}")
+        return f"Error analyzing macro news: {str(e)[:100]}... Please try again later."
+
+async def analyze_macro_news_async(user_query: str = None, on_chunk=None, executor=None):
+    """Async counterpart of `analyze_macro_news`.
 
-        if raw_news is None:
-            return "Error: Failed to fetch news data, try again later..."
+    The fetches are awaited without blocking the event loop (the snapshot caches
+    already share concurrent loads); classification and the Gemini call then run
+    in `executor` (the loop's default one if None), coalesced with identical
+    in-flight questions from either path.
+    """
+    try:
+        with track_stage("macro", "fetch_inputs"):
+            inputs = await fetch_concurrently_async(MACRO_INPUTS, MACRO_FETCH_TIMEOUT)
 
-        # Check if raw_news is a dictionary and has the expected structure
-        if not isinstance(raw_news, dict) or 'items' not in raw_news:
-            return "Error: Unexpected format from news feed, try again later..."
+        def analyze(on_chunk):
+            return analyze_macro_inputs(inputs["feed"], inputs["calendar"], user_query, on_chunk)
 
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor, contextvars.copy_context().run,
+            command_flights.do, macro_flight_key(user_query), analyze, on_chunk
+        )
+    except Exception as e:
+        logger.error(f"Error in analyze_macro_news_async: {e}")
+        return f"Error analyzing macro news: {str(e)[:100]}... Please try again later."
+
+def analyze_macro_inputs(raw_news, calendar_data, user_query: str = None, on_chunk=None):
+    """Classify the fetched feed and calendar, then ask Gemini (cached per input)."""
+    if raw_news is None:
+        return "Error: Failed to fetch news data, try again later..."
+
+    # Check if raw_news is a dictionary and has the expected structure
+    if not isinstance(raw_news, dict) or 'items' not in raw_news:
+        return "Error: Unexpected format from news feed, try again later..."
+
+    with track_stage("macro", "classify"):
         us_news, china_news, global_news = classify_and_format_news(raw_news)
+        calendar_news = format_calendar_economy(calendar_data)
 
-        calendar_news = filtered_calendar_economy()
+    # Check if calendar_news is an error message (string)
+    if isinstance(calendar_news, str):
+        # If it's an error message, we can still proceed with empty calendar data
+        logger.warning(f"Calendar data error: {calendar_news}. Proceeding with empty calendar data.")
+        calendar_news = []
 
-        # Check if calendar_news is an error message (string)
-        if isinstance(calendar_news, str):
-            # If it's an error message, we can still proceed with empty calendar data
-            logger.warning(f"Calendar data error: {calendar_news}. Proceeding with empty calendar data.")
-            calendar_news = []
+    # Same headlines + calendar + question -> reuse the previous AI answer
+    cache_key = make_cache_key("macro", us_news, china_news, global_news, calendar_news, normalize_question(user_query))
+    cached_result = llm_response_cache.get(cache_key)
+    if cached_result is not None:
+        return cached_result
 
+    with track_stage("macro", "build_prompt"):
         prompt = generate_macro_prompt(us_news, china_news, global_news, calendar_news, user_question=user_query)
 
-        return get_gemini_response_v2(prompt)
-    except Exception as e:
-        logger.error(f"Error in analyze_macro_news: {e}")
-        return f"Error analyzing macro news: {str(e)[:100]}... Please try again later."
+    with track_stage("macro", "llm"):
+        result = get_gemini_response_v2(prompt, on_chunk=on_chunk)
+    if not is_error_response(result):
+        llm_response_cache.put(cache_key, result)
+
+    return result
 
 
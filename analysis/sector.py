@@ -1,6 +1,10 @@
 from config.app_config import logger
 from helpers.api_helpers import fetch_data_sector, get_gemini_response
 from helpers.utils import format_to_usd
+from helpers.gemini_client import is_error_response
+from helpers.response_cache import llm_response_cache, make_cache_key, normalize_question
+from helpers.single_flight import command_flights
+from helpers.metrics import track_stage
 
 def generate_sector_prompt(all_sectors_data: list = None, user_question=None):
     """Generate a prompt for the Gemini model to analyze crypto sector performance."""
@@ -49,10 +53,43 @@ Instructions:
 Respond only with the formatted analysis or the fallback message. No extra commentary.
 """
 
+# TODO* FORMAT SECTOR ROWS
+def format_sector_rows(sector_data):
+    """Format the rows of the Sector Category sheet (header excluded) as prompt lines."""
+    sectors_formatted = []
+
+    for row in sector_data:
+        # Validasi struktur row
+        if len(row) < 5:
+            continue  # Skip row yang tidak lengkap
+
+        try:
+            sector_name = row[0]
+            volume = format_to_usd(float(row[1]))
+            market_cap = format_to_usd(float(row[2]))
+            market_cap_change = f"{float(row[3]):.2f}%"
+            activity = f"{float(row[4]):.2f}%"
+
+            sector_info = f"• {sector_name}, Volume: {volume}, Market Cap: {market_cap}, MCap Change: {market_cap_change}, Activity {activity}"
+
+            sectors_formatted.append(sector_info)
+
+        except (ValueError, IndexError) as e:
+            logger.warning(f"Skipping row due to SECTOR formatting error: {e}")
+            continue
+
+    return sectors_formatted
+
 # TODO* ANALYZE SECTOR
-def analyze_sector(user_query):
+def analyze_sector(user_query, on_chunk=None):
+    # Concurrent identical questions share one fetch and one Gemini call
+    key = make_cache_key("sector", normalize_question(user_query))
+    return command_flights.do(key, lambda on_chunk: _analyze_sector(user_query, on_chunk), on_chunk)
+
+def _analyze_sector(user_query, on_chunk=None):
     try:
-        raw_sectors = fetch_data_sector()
+        with track_stage("sector", "fetch_data"):
+            raw_sectors = fetch_data_sector()
 
         if raw_sectors is None or 'values' not in raw_sectors:
             return "Error: Failed to fetch sector data, or No 'values' field in sector data, try again later..."
@@ -60,35 +97,28 @@ def analyze_sector(user_query):
         sector_data = raw_sectors['values'][1:]  # Ignore header at [0:]
 
         # Formatted Sectors
-        sectors_formatted = []
-
-        for row in sector_data:
-            # Validasi struktur row
-            if len(row) < 5:
-                continue  # Skip row yang tidak lengkap
-
-            try:
-                sector_name = row[0]
-                volume = format_to_usd(float(row[1]))
-                market_cap = format_to_usd(float(row[2]))
-                market_cap_change = f"{float(row[3]):.2f}%"
-                activity = f"{float(row[4]):.2f}%"
-
-                sector_info = f"• {sector_name}, Volume: {volume}, Market Cap: {market_cap}, MCap Change: {market_cap_change}, Activity {activity}"
-
-                sectors_formatted.append(sector_info)
-
-            except (ValueError, IndexError) as e:
-                logger.warning(f"Skipping row due to SECTOR formatting error: {e}")
-                continue
+        with track_stage("sector", "format_rows"):
+            sectors_formatted = format_sector_rows(sector_data)
 
         if not sectors_formatted:
             return "No sector data to analyze."
 
 
-        prompt = generate_sector_prompt(all_sectors_data=sectors_formatted, user_question=user_query)
+        # Same sector data + same question -> reuse the previous AI answer
+        cache_key = make_cache_key("sector", sectors_formatted, normalize_question(user_query))
+        cached_result = llm_response_cache.get(cache_key)
+        if cached_result is not None:
+            return cached_result
+
+        with track_stage("sector", "build_prompt"):
+            prompt = generate_sector_prompt(all_sectors_data=sectors_formatted, user_question=user_query)
+
+        with track_stage("sector", "llm"):
+            result = get_gemini_response(prompt, on_chunk=on_chunk)
+        if not is_error_response(result):
+            llm_response_cache.put(cache_key, result)
 
-        return get_gemini_response(prompt)
+        return result
 
     except KeyError as e:
         logger.error(f"Error: Missing expected key in SECTOR DATA: {e}")
@@ -1,7 +1,26 @@
+import os
+import secrets
+import threading
+import time
 from helpers.utils import format_currency
-from analysis.cap_analysis import detect_early_momentum_v2
+from analysis.cap_analysis import detect_early_momentum_all, MARKET_CAP_CATEGORIES
+from helpers.metrics import track_stage
+from helpers.response_cache import ResponseCache
+from helpers.worker_pool import background_threads_enabled
+from config.app_config import logger, RANKING_CACHE_SIZE, RANKING_CACHE_TTL, REPORT_REFRESH_INTERVAL
 from datetime import datetime
 
+# Rankings served by the category commands, kept so later pages are read from the
+# same ranking instead of rescoring: "<ranking id>:<category>" and category name
+# -> (ranking id, RankedTokens). The ranking id is derived from the sheet data, so
+# rescoring an unchanged sheet reuses the cached rankings (and the one snapshot
+# they reference) instead of caching another copy of the sheet.
+ranking_cache = ResponseCache(RANKING_CACHE_SIZE, RANKING_CACHE_TTL)
+
+# Callback data of the inline "next page" button: "momentum:<category>:<ranking id>:<cursor>"
+PAGE_CALLBACK_PREFIX = "momentum"
+MOMENTUM_PAGE_SIZE = 15
+
 def format_token_summary(token, index=None):
     """Format ringkasan token untuk pesan Telegram."""
     try:
@@ -24,6 +43,8 @@ def format_token_summary(token, index=None):
             
         volatility = float(token.get("Volatility Score", 0))
         score = float(token.get("Early Momentum Score", 0))
+        score_change = token.get("Score Change")
+        score_change_text = f" ({score_change:+.2f})" if score_change is not None else ""
         # strength = token.get("Momentum Strength", "Unknown")
         
         # Pastikan momentum_days adalah integer
@@ -93,7 +114,7 @@ def format_token_summary(token, index=None):
             f"🔄 Turnover: {turnover:.2f}\n"
             f"📈 Volatility: {volatility:.2f}\n"
             f"{momentum_emoji} Momentum: {momentum_days}d ({momentum_type})\n"
-            f"🏆 Score: {score:.2f}\n"
+            f"🏆 Score: {score:.2f}{score_change_text}\n"
             f"📝 Strength: {signal}\n"
             "```"
         )
@@ -114,20 +135,206 @@ def format_token_summary(token, index=None):
         
         return error_msg 
 
-def format_category_tokens(category_name, limit=15):
-    """Format token dengan early momentum untuk kategori tertentu."""
-    tokens = detect_early_momentum_v2(category_name)
+def format_category_tokens(category_name, limit=15, momentum=None):
+    """Format token dengan early momentum untuk kategori tertentu.
+
+    Args:
+        category_name (str): Kategori market cap
+        limit (int): Jumlah token maksimal yang ditampilkan
+        momentum (dict): Hasil `detect_early_momentum_all` yang sudah dihitung,
+            agar beberapa kategori bisa dibaca dari satu snapshot yang sama
+    """
+    if momentum is None:
+        momentum = detect_early_momentum_all((category_name,))
+    tokens = momentum.get(category_name, [])
     
     if not tokens:
         return f"No tokens with early momentum detected in {category_name} category.\n"
 
-    result = f"*TOP {category_name.upper()} TOKENS WITH MOMENTUM*\n\n"
-    
-    for i, token in enumerate(tokens[:limit]):
-        result += format_token_summary(token, i) + "\n"
+    with track_stage("momentum", "format"):
+        return _format_ranked_tokens(category_name, tokens[:limit])
 
+def _format_ranked_tokens(category_name, tokens, start=0, total=None):
+    """Header plus one summary per token, `start` being the rank offset of the first token."""
+    result = f"*TOP {category_name.upper()} TOKENS WITH MOMENTUM*"
+    if start:
+        result += f" (#{start + 1}-{start + len(tokens)} of {total})"
+    result += "\n\n"
+
+    for i, token in enumerate(tokens, start):
+        result += format_token_summary(token, i) + "\n"
     return result
 
+def _remember_ranking(category_name, ranking):
+    """Cache a ranking under its ranking id and as the category's latest one.
+
+    A ranking of sheet data that is already cached is dropped in favour of the
+    cached one (which takes over the newer load time).
+    """
+    ranking_id = ranking.snapshot_id[:12] if ranking.snapshot_id else secrets.token_hex(4)
+    key = f"{ranking_id}:{category_name}"
+    cached = ranking_cache.get(key)
+    if cached is not None:
+        cached[1].data_at = max(cached[1].data_at, ranking.data_at)
+        ranking = cached[1]
+
+    ranked = (ranking_id, ranking)
+    ranking_cache.put(key, ranked)
+    ranking_cache.put(category_name, ranked)
+    return ranked
+
+def get_category_ranking(category_name, ranking_id=None):
+    """Ranking of one category, reused from the ranking cache when possible.
+
+    Args:
+        category_name (str): Kategori market cap
+        ranking_id (str): Ranking a page was cut from, None for the latest
+            cached ranking of the category
+
+    Returns:
+        tuple: (ranking_id, RankedTokens)
+    """
+    cached = ranking_cache.get(f"{ranking_id}:{category_name}" if ranking_id else category_name)
+    if cached is not None and cached[1].category_name == category_name:
+        return cached
+    return _remember_ranking(category_name, detect_early_momentum_all((category_name,))[category_name])
+
+def _render_page(category_name, ranking_id, ranking, cursor, limit):
+    """Render one page of a ranking, returns (text, next_page)."""
+    if not ranking:
+        return f"No tokens with early momentum detected in {category_name} category.\n", None
+
+    tokens, next_cursor = ranking.page(cursor, limit)
+    if not tokens:
+        return f"No more tokens with early momentum in {category_name} category ({len(ranking)} ranked).\n", None
+
+    with track_stage("momentum", "format"):
+        text = _format_ranked_tokens(category_name, tokens, cursor, len(ranking))
+
+    next_page = page_callback_data(category_name, ranking_id, next_cursor) if next_cursor is not None else None
+    return text, next_page
+
+def format_report_age(data_at):
+    """Footer telling how old the sheet snapshot behind a report is."""
+    age = max(0, int(time.time() - data_at))
+    if age < 60:
+        label = f"{age}s"
+    elif age < 3600:
+        label = f"{age // 60}m"
+    else:
+        label = f"{age // 3600}h {age % 3600 // 60}m"
+    return f"_Updated {label} ago_\n"
+
+def format_category_page(category_name, cursor=0, ranking_id=None, limit=MOMENTUM_PAGE_SIZE):
+    """Format one page of a category ranking.
+
+    The first page is the report precomputed by the report scheduler; later
+    pages are cut from the ranking they continue, and only rescore when that
+    ranking is no longer cached.
+
+    Args:
+        category_name (str): Kategori market cap
+        cursor (int): Rank offset of the page
+        ranking_id (str): Ranking the page continues, see `page_callback_data`
+        limit (int): Jumlah token per halaman
+
+    Returns:
+        tuple: (text, next_page) where next_page is the callback data of the
+            following page, or None on the last page
+    """
+    if not cursor and not ranking_id and limit == MOMENTUM_PAGE_SIZE:
+        text, next_page, data_at = get_category_report(category_name)
+        return text + format_report_age(data_at), next_page
+
+    ranking_id, ranking = get_category_ranking(category_name, ranking_id)
+    text, next_page = _render_page(category_name, ranking_id, ranking, cursor, limit)
+    return text + format_report_age(ranking.data_at), next_page
+
+def page_callback_data(category_name, ranking_id, cursor):
+    return f"{PAGE_CALLBACK_PREFIX}:{category_name}:{ranking_id}:{cursor}"
+
+def parse_page_callback(data):
+    """Inverse of `page_callback_data`, returns (category, ranking_id, cursor) or None."""
+    parts = (data or "").split(":")
+    if len(parts) != 4 or parts[0] != PAGE_CALLBACK_PREFIX or parts[1] not in MARKET_CAP_CATEGORIES or not parts[3].isdigit():
+        return None
+    return parts[1], parts[2], int(parts[3])
+
+# TODO* PRECOMPUTED CATEGORY REPORTS
+# A background thread scores all categories from one snapshot every
+# REPORT_REFRESH_INTERVAL seconds, renders their first pages and swaps the whole
+# set in at once, so the category commands just read the latest report. The
+# thread reloads the sheet itself (the snapshot cache would hand it the expired
+# snapshot and only refresh in the background). Only a cold process (no report
+# yet) computes on the request path, or every request once the reports are
+# older than REPORT_REFRESH_INTERVAL when background threads do not run.
+_category_reports = {}  # category -> (text, next_page, data_at), replaced as a whole
+_refresh_lock = threading.RLock()
+_scheduler_lock = threading.Lock()
+_scheduler_pid = None
+
+def refresh_category_reports(max_age=None, fresh=False):
+    """Score every category from one snapshot and swap in their first pages.
+
+    Args:
+        max_age (float): Skip the refresh when the data of the current reports
+            is younger than this many seconds (None always refreshes)
+        fresh (bool): Reload the sheet from upstream, see `detect_early_momentum_all`
+    """
+    global _category_reports
+    with _refresh_lock:
+        if max_age is not None and _category_reports:
+            oldest = min(data_at for _, _, data_at in _category_reports.values())
+            if time.time() - oldest < max_age:
+                return
+
+        with track_stage("momentum", "precompute"):
+            momentum = detect_early_momentum_all(MARKET_CAP_CATEGORIES, fresh=fresh)
+            reports = {}
+            for category_name in MARKET_CAP_CATEGORIES:
+                ranking_id, ranking = _remember_ranking(category_name, momentum[category_name])
+                text, next_page = _render_page(category_name, ranking_id, ranking, 0, MOMENTUM_PAGE_SIZE)
+                reports[category_name] = (text, next_page, ranking.data_at)
+
+        _category_reports = reports
+
+def get_category_report(category_name):
+    """Latest precomputed report of a category, computed now only on a cold process.
+
+    Returns:
+        tuple: (text, next_page, data_at) of the first page
+    """
+    start_report_scheduler()
+    if not background_threads_enabled():
+        refresh_category_reports(max_age=REPORT_REFRESH_INTERVAL)
+    report = _category_reports.get(category_name)
+    if report is None:
+        # Concurrent cold callers wait for a single refresh
+        with _refresh_lock:
+            if category_name not in _category_reports:
+                refresh_category_reports()
+        report = _category_reports[category_name]
+    return report
+
+def _report_scheduler_loop():
+    while True:
+        try:
+            # A request may have refreshed the reports in the meantime
+            refresh_category_reports(max_age=REPORT_REFRESH_INTERVAL / 2, fresh=True)
+        except Exception as e:
+            logger.error(f"Error refreshing category reports: {e}")
+        time.sleep(REPORT_REFRESH_INTERVAL)
+
+def start_report_scheduler():
+    """Start the report refresh thread once per process (if background threads run)."""
+    global _scheduler_pid
+    if _scheduler_pid == os.getpid() or not background_threads_enabled():
+        return
+    with _scheduler_lock:
+        if _scheduler_pid != os.getpid():
+            threading.Thread(target=_report_scheduler_loop, name="category-reports", daemon=True).start()
+            _scheduler_pid = os.getpid()
+
 def format_detailed_analysis(token, index):
     """Format analisis detail token untuk Telegram."""
     try:
@@ -161,18 +368,12 @@ def generate_momentum_report():
     report = f"*EARLY MOMENTUM TOKEN REPORT - {timestamp}*\n"
     report += "Tokens showing early signs of momentum across market cap categories\n\n"
 
-    # Store all tokens for later analysis
-    all_category_tokens = {}
+    # Get tokens for all categories from a single fetch of the sheet
+    all_category_tokens = detect_early_momentum_all(MARKET_CAP_CATEGORIES)
 
-    # Get tokens for each category
-    all_category_tokens["largeCap"] = detect_early_momentum_v2("largeCap")
-    all_category_tokens["midCap"] = detect_early_momentum_v2("midCap")
-    all_category_tokens["smallCap"] = detect_early_momentum_v2("smallCap")
-    all_category_tokens["microCap"] = detect_early_momentum_v2("microCap")
-    
     # Add category summaries to report
-    for category in ["largeCap", "midCap", "smallCap", "microCap"]:
-        report += format_category_tokens(category) + "\n"
+    for category in MARKET_CAP_CATEGORIES:
+        report += format_category_tokens(category, momentum=all_category_tokens) + "\n"
 
     # Add detailed analysis section
     report += "*DETAILED ANALYSIS OF TOP MOMENTUM TOKENS*\n\n"
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the macro headline bucketing.
+
+Compares the single-pass keyword matcher in analysis/macro.py against the
+previous implementation (six regexes compiled per call, up to six searches per
+title) and checks both produce the same buckets.
+
+Run from the project root:
+    python -m benchmarks.bench_news_matcher
+"""
+
+import random
+import re
+import timeit
+
+from analysis.macro import (
+    classify_news_titles, US_KEYWORDS, CHINA_KEYWORDS, GLOBAL_KEYWORDS,
+    US_LOCATIONS, CHINA_LOCATIONS, GLOBAL_LOCATIONS
+)
+
+HEADLINE_WORDS = (
+    "fed fomc cpi core inflation china beijing yuan ecb japan oil iran us usa usd trump stocks "
+    "gold rally treasury yields pboc stimulus germany uk boj war gaza dollar eur nfp payrolls "
+    "tokyo swiss apple earnings fiscal policy new zealand york real estate middle east "
+    "the a of to in on rises falls says sees expects"
+).split()
+
+
+def legacy_classify_news_titles(titles):
+    """Previous implementation, kept here as the benchmark baseline."""
+    def build_pattern(keywords):
+        return re.compile(r'\b(' + '|'.join(map(re.escape, keywords)) + r')\b', re.IGNORECASE)
+
+    us_pattern = build_pattern(US_KEYWORDS)
+    china_pattern = build_pattern(CHINA_KEYWORDS)
+    global_pattern = build_pattern(GLOBAL_KEYWORDS)
+
+    us_location_pattern = build_pattern(US_LOCATIONS)
+    china_location_pattern = build_pattern(CHINA_LOCATIONS)
+    global_location_pattern = build_pattern(GLOBAL_LOCATIONS)
+
+    buckets = []
+
+    for title in titles:
+        is_us = us_pattern.search(title)
+        is_china = china_pattern.search(title)
+        is_global = global_pattern.search(title)
+
+        if is_us and us_location_pattern.search(title):
+            buckets.append("us")
+        elif is_china and china_location_pattern.search(title):
+            buckets.append("china")
+        elif is_global and global_location_pattern.search(title):
+            buckets.append("global")
+        else:
+            if us_location_pattern.search(title):
+                buckets.append("us")
+            elif china_location_pattern.search(title):
+                buckets.append("china")
+            elif global_location_pattern.search(title):
+                buckets.append("global")
+            else:
+                buckets.append("global")
+
+    return buckets
+
+
+def make_titles(count, seed=0):
+    rng = random.Random(seed)
+    titles = []
+    for _ in range(count):
+        words = [rng.choice(HEADLINE_WORDS) for _ in range(rng.randint(4, 16))]
+        titles.append(" ".join(word.upper() if rng.random() < 0.1 else word for word in words))
+    return titles
+
+
+def run(sizes=(1, 50, 1000), repeat=5):
+    for size in sizes:
+        titles = make_titles(size, seed=size)
+        assert classify_news_titles(titles) == legacy_classify_news_titles(titles), "bucket mismatch"
+
+        number = max(1, 2000 // size)
+        legacy = min(timeit.repeat(lambda: legacy_classify_news_titles(titles), number=number, repeat=repeat)) / number
+        single = min(timeit.repeat(lambda: classify_news_titles(titles), number=number, repeat=repeat)) / number
+        print(f"{size:>6} titles | legacy {legacy * 1e3:9.3f} ms | single-pass {single * 1e3:9.3f} ms | x{legacy / single:5.1f}")
+
+
+if __name__ == "__main__":
+    run()
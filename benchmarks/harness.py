@@ -0,0 +1,57 @@
+"""
+Timing and memory harness for the benchmarks.
+
+Timing and memory are measured in separate runs: tracemalloc slows the
+measured code down, so it is only enabled for the memory run.
+"""
+
+import contextlib
+import io
+import statistics
+import time
+import tracemalloc
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence stdout (the engine prints its warnings)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def time_call(fn, repeat=5, number=1):
+    """
+    Time `fn()`
+
+    Returns:
+        dict: best and median seconds per call over `repeat` rounds of `number` calls
+    """
+    rounds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - started) / number)
+    return {"best": min(rounds), "median": statistics.median(rounds)}
+
+
+def peak_memory(fn):
+    """Peak bytes allocated by Python during one `fn()` call."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def measure(fn, repeat=5, number=1, warmup=1):
+    """Warm up, then time `fn()` and measure its peak memory."""
+    with quiet():
+        for _ in range(warmup):
+            fn()
+        result = time_call(fn, repeat=repeat, number=number)
+        result["peak_memory"] = peak_memory(fn)
+    return result
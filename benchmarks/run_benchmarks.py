@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Benchmarks of the analysis hot paths on deterministic synthetic payloads.
+
+Run from the project root:
+    python -m benchmarks.run_benchmarks                       # all cases, all sizes
+    python -m benchmarks.run_benchmarks --sizes 100 1000      # smaller sizes only
+    python -m benchmarks.run_benchmarks --only detect_outliers
+    python -m benchmarks.run_benchmarks --record              # update baselines.json
+    python -m benchmarks.run_benchmarks --check               # exit 1 on regression
+
+--check compares the best time and the peak memory of every case against
+baselines.json and fails when one exceeds its baseline by more than
+--tolerance (default 1.5x). Baselines are machine-specific: record them on the
+machine that runs the check.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+
+import numpy as np
+
+import analysis.cap_analysis as cap_analysis
+import analysis.macro as macro
+from analysis.cap_analysis import detect_early_momentum_all, detect_early_momentum_v2, detect_outliers, winsorize
+from analysis.token import format_category_tokens
+from helpers.token_history import TokenHistoryStore
+from helpers.utils import parse_float, parse_float_column
+from benchmarks.harness import measure, quiet
+from benchmarks.synthetic import SIZES, messy_numbers, token_sheet, rss_feed
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+
+@contextlib.contextmanager
+def synthetic_tokens(rows):
+    """Serve a synthetic Tokens sheet to the engine, with a throwaway history store."""
+    payload = token_sheet(rows, seed=rows)
+    original_fetch, original_history = cap_analysis.fetch_data_token, cap_analysis.token_history
+    with tempfile.TemporaryDirectory() as history_dir:
+        cap_analysis.fetch_data_token = lambda: payload
+        cap_analysis.token_history = TokenHistoryStore(history_dir, interval=3600, max_segments=2)
+        try:
+            yield payload
+        finally:
+            cap_analysis.fetch_data_token, cap_analysis.token_history = original_fetch, original_history
+
+
+def sample_values(rows):
+    """Heavy-tailed metric column, like hype or turnover."""
+    rng = np.random.default_rng(rows)
+    return rng.lognormal(mean=1.0, sigma=1.5, size=rows)
+
+
+# TODO* BENCHMARK CASES
+# Each case is a context manager that yields the function to measure.
+@contextlib.contextmanager
+def case_parse_float(rows):
+    cells = messy_numbers(rows, seed=rows)
+    yield lambda: [parse_float(cell) for cell in cells]
+
+
+@contextlib.contextmanager
+def case_parse_float_column(rows):
+    cells = messy_numbers(rows, seed=rows)
+    yield lambda: parse_float_column(cells)
+
+
+@contextlib.contextmanager
+def case_parse_float_column_clean(rows):
+    # Unformatted numeric column, parsed by the numpy fast path
+    cells = [repr(value) for value in sample_values(rows).tolist()]
+    yield lambda: parse_float_column(cells)
+
+
+@contextlib.contextmanager
+def case_winsorize(rows):
+    values = sample_values(rows)
+    yield lambda: winsorize(values)
+
+
+@contextlib.contextmanager
+def case_detect_outliers(rows):
+    values = sample_values(rows)
+    yield lambda: detect_outliers(values, method="hybrid", threshold=1.5, sensitivity=1.5)
+
+
+@contextlib.contextmanager
+def case_detect_early_momentum_v2(rows):
+    # The warmup call records the snapshot, timed calls see the steady state.
+    # Rankings are lazy, so materialize every ranked token
+    with synthetic_tokens(rows):
+        yield lambda: list(detect_early_momentum_v2("smallCap"))
+
+
+@contextlib.contextmanager
+def case_detect_early_momentum_v2_first_page(rows):
+    # Only the first page, like the category commands read it
+    with synthetic_tokens(rows):
+        yield lambda: detect_early_momentum_v2("smallCap")[:15]
+
+
+@contextlib.contextmanager
+def case_format_category_tokens(rows):
+    # Whole command path: fetch, parse, score, top-K and formatting
+    with synthetic_tokens(rows):
+        yield lambda: format_category_tokens("smallCap")
+
+
+@contextlib.contextmanager
+def case_format_category_tokens_formatting(rows):
+    # Formatting only, the ranking is computed once up front
+    with synthetic_tokens(rows), quiet():
+        momentum = detect_early_momentum_all()
+    yield lambda: format_category_tokens("smallCap", momentum=momentum)
+
+
+@contextlib.contextmanager
+def case_classify_and_format_news_cold(rows):
+    feed = rss_feed(rows, seed=rows)
+
+    def run():
+        macro._news_item_cache.clear()
+        macro.classify_and_format_news(feed)
+    yield run
+
+
+@contextlib.contextmanager
+def case_classify_and_format_news_warm(rows):
+    # Same feed every call: every item is already classified
+    feed = rss_feed(rows, seed=rows)
+    yield lambda: macro.classify_and_format_news(feed)
+
+
+CASES = {
+    "parse_float": case_parse_float,
+    "parse_float_column": case_parse_float_column,
+    "parse_float_column_clean": case_parse_float_column_clean,
+    "winsorize": case_winsorize,
+    "detect_outliers": case_detect_outliers,
+    "detect_early_momentum_v2": case_detect_early_momentum_v2,
+    "detect_early_momentum_v2_first_page": case_detect_early_momentum_v2_first_page,
+    "format_category_tokens": case_format_category_tokens,
+    "format_category_tokens_formatting": case_format_category_tokens_formatting,
+    "classify_and_format_news_cold": case_classify_and_format_news_cold,
+    "classify_and_format_news_warm": case_classify_and_format_news_warm,
+}
+
+
+def run(case_names, sizes, repeat):
+    results = {}
+    for name in case_names:
+        for rows in sizes:
+            # Keep small cases above timer resolution, large ones affordable
+            number = max(1, 10_000 // rows)
+            with CASES[name](rows) as fn:
+                result = measure(fn, repeat=repeat if rows < 100_000 else max(1, repeat // 2), number=number)
+            results[f"{name}@{rows}"] = result
+            print(f"{name:<32}{rows:>8} rows | best {result['best'] * 1e3:10.3f} ms | "
+                  f"median {result['median'] * 1e3:10.3f} ms | peak {result['peak_memory'] / 1024:10.1f} KiB")
+    return results
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH, encoding="utf-8") as f:
+        return json.load(f).get("results", {})
+
+
+def record_baselines(results):
+    baselines = load_baselines()
+    baselines.update(results)
+    with open(BASELINES_PATH, "w", encoding="utf-8") as f:
+        json.dump({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "numpy": np.__version__,
+            "results": dict(sorted(baselines.items())),
+        }, f, indent=2)
+        f.write("\n")
+    print(f"Recorded {len(results)} baselines to {BASELINES_PATH}")
+
+
+def check_baselines(results, tolerance):
+    """Print regressions against the recorded baselines, return True if none."""
+    baselines = load_baselines()
+    regressions = []
+    for key, result in results.items():
+        baseline = baselines.get(key)
+        if baseline is None:
+            print(f"No baseline for {key}, skipped")
+            continue
+        for metric in ("best", "peak_memory"):
+            if baseline[metric] and result[metric] > baseline[metric] * tolerance:
+                regressions.append(f"{key} {metric}: {result[metric]:.6g} vs baseline {baseline[metric]:.6g}")
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return not regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis hot paths")
+    parser.add_argument("--only", nargs="+", choices=sorted(CASES), help="cases to run (default: all)")
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES), help="row counts")
+    parser.add_argument("--repeat", type=int, default=5, help="timed rounds per case")
+    parser.add_argument("--record", action="store_true", help="store the results as baselines")
+    parser.add_argument("--check", action="store_true", help="fail on regressions against the baselines")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed slowdown factor for --check")
+    args = parser.parse_args(argv)
+
+    results = run(args.only or list(CASES), args.sizes, args.repeat)
+
+    if args.record:
+        record_baselines(results)
+    if args.check and not check_baselines(results, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Deterministic synthetic payloads for the benchmarks.
+
+Every generator takes a row count and a seed and always returns the same
+payload for the same arguments. Numeric cells use the messy string formats
+seen in the Google Sheets exports ("$1,234.56", "12.5%", "(3.20)", " 42 ",
+"", "n/a", native numbers) and some rows are shorter than the header.
+"""
+
+import random
+
+SIZES = (100, 1_000, 10_000, 100_000)
+
+TOKEN_HEADERS = [
+    "Tokens", "Price", "Market Cap", "Total Volume", "Circulating Supply", "Market Cap (Change 24h)",
+    "Price Changes 24h", "Price Changes 7d", "Turnover (% Cirulating Supply Traded)", "Hype Activity",
+    "Volatility 24h", "Volatility"
+]
+
+SECTOR_HEADERS = ["Sector", "Volume", "Market Cap", "Market Cap Change", "Activity"]
+
+HEADLINE_WORDS = (
+    "fed fomc cpi core inflation china beijing yuan ecb japan oil iran us usa usd trump stocks "
+    "gold rally treasury yields pboc stimulus germany uk boj war gaza dollar eur nfp payrolls "
+    "tokyo swiss apple earnings fiscal policy new zealand real estate middle east debt ceiling "
+    "the a of to in on rises falls says sees expects above below forecast"
+).split()
+
+
+def messy_number(value, rng):
+    """Render one number the way a sheet cell might contain it."""
+    pick = rng.random()
+    if pick < 0.20:
+        return f"${value:,.2f}"
+    if pick < 0.30:
+        return f"{value:.2f}%"
+    if pick < 0.35:
+        return ""
+    if pick < 0.40 and value < 0:
+        return f"({abs(value):.2f})"
+    if pick < 0.45:
+        return value
+    if pick < 0.47:
+        return "n/a"
+    if pick < 0.50:
+        return f" {value:.4f} "
+    return f"{value}"
+
+
+def messy_numbers(count, seed=0):
+    """A column of `count` messy numeric cells."""
+    rng = random.Random(seed)
+    return [messy_number(rng.uniform(-1e6, 1e9), rng) for _ in range(count)]
+
+
+def token_sheet(rows, seed=0):
+    """Tokens sheet payload as returned by `fetch_data_token`."""
+    rng = random.Random(seed)
+    values = [list(TOKEN_HEADERS)]
+
+    for i in range(rows):
+        market_cap = 10 ** rng.uniform(5, 12)
+        cells = {
+            "Price": rng.uniform(0.001, 100),
+            "Market Cap": market_cap if rng.random() > 0.05 else 0.0,
+            "Total Volume": market_cap * rng.uniform(0, 0.5),
+            "Circulating Supply": market_cap / rng.uniform(0.01, 100),
+            "Market Cap (Change 24h)": rng.choice([rng.uniform(-20, 40), 5.0, 0.0]),
+            "Price Changes 24h": rng.choice([rng.uniform(-20, 40), 3.0]),
+            "Price Changes 7d": rng.uniform(-50, 80),
+            "Turnover (% Cirulating Supply Traded)": rng.uniform(0, 30) if rng.random() < 0.5 else None,
+            "Hype Activity": rng.uniform(0, 60) if rng.random() < 0.5 else None,
+            "Volatility 24h": rng.choice([0.0, rng.uniform(0, 80)]),
+            "Volatility": rng.choice([0.0, rng.uniform(0, 80)]),
+        }
+        row = [f"TOKEN{i}"] + [
+            "" if cells[header] is None else messy_number(cells[header], rng)
+            for header in TOKEN_HEADERS[1:]
+        ]
+        if rng.random() < 0.05:
+            row = row[:rng.randint(1, len(row))]
+        values.append(row)
+
+    return {"range": "Tokens!A1:L", "majorDimension": "ROWS", "values": values}
+
+
+def sector_sheet(rows, seed=0):
+    """Sector Category sheet payload as returned by `fetch_data_sector`."""
+    rng = random.Random(seed)
+    values = [list(SECTOR_HEADERS)]
+
+    for i in range(rows):
+        market_cap = 10 ** rng.uniform(7, 12)
+        row = [
+            f"Sector {i}",
+            messy_number(market_cap * rng.uniform(0, 0.3), rng),
+            messy_number(market_cap, rng),
+            messy_number(rng.uniform(-15, 25), rng),
+            messy_number(rng.uniform(-50, 200), rng),
+        ]
+        if rng.random() < 0.05:
+            row = row[:rng.randint(1, len(row))]
+        values.append(row)
+
+    return {"range": "Sector Category!A1:E", "majorDimension": "ROWS", "values": values}
+
+
+def rss_feed(rows, seed=0, guid_prefix="item"):
+    """FinancialJuice RSS2JSON payload as returned by `fetch_financialjuice_feed`."""
+    rng = random.Random(seed)
+    items = []
+
+    for i in range(rows):
+        words = [rng.choice(HEADLINE_WORDS) for _ in range(rng.randint(4, 16))]
+        title = " ".join(word.upper() if rng.random() < 0.1 else word for word in words)
+        items.append({
+            "title": f"FinancialJuice: {title}",
+            "pubDate": f"2025-05-{1 + i // 1440 % 28:02d} {i // 60 % 24:02d}:{i % 60:02d}:00",
+            "link": f"https://www.financialjuice.com/News/{guid_prefix}/{i}",
+            "guid": f"{guid_prefix}-{i}",
+            "author": "",
+            "description": "",
+            "categories": [],
+        })
+
+    return {"status": "ok", "feed": {"title": "FinancialJuice"}, "items": items}
@@ -15,6 +15,24 @@ logger = logging.getLogger(__name__)
 # Project Root PythonAnywhere
 PROJECT_ROOT = "/home/gafarybyh/elephant_agent_bot"
 
+# Re-authorize the shared gspread client before its access token (1h) expires
+GSPREAD_CLIENT_TTL = float(os.getenv("GSPREAD_CLIENT_TTL", "3000"))
+
+# Write-behind export of new users to Google Sheets (rows per batch, seconds)
+SHEETS_EXPORT_BATCH_SIZE = int(os.getenv("SHEETS_EXPORT_BATCH_SIZE", "50"))
+SHEETS_EXPORT_INTERVAL = float(os.getenv("SHEETS_EXPORT_INTERVAL", "30"))
+
+# Local data directory (SQLite registry, spools, snapshots)
+DATA_DIR = os.getenv("DATA_DIR") or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+SUBSCRIBER_DB_PATH = os.getenv("SUBSCRIBER_DB_PATH") or os.path.join(DATA_DIR, "subscribers.db")
+
+# Token snapshot history (segment directory, seconds between recorded snapshots, segments kept,
+# max seconds between the 24h baseline segment and now - 24h)
+TOKEN_HISTORY_DIR = os.getenv("TOKEN_HISTORY_DIR") or os.path.join(DATA_DIR, "token_history")
+TOKEN_HISTORY_INTERVAL = float(os.getenv("TOKEN_HISTORY_INTERVAL", "3600"))
+TOKEN_HISTORY_MAX_SEGMENTS = int(os.getenv("TOKEN_HISTORY_MAX_SEGMENTS", "720"))
+TOKEN_HISTORY_WINDOW_TOLERANCE = float(os.getenv("TOKEN_HISTORY_WINDOW_TOLERANCE", "7200"))
+
 # Environment variable
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 RSS2JSON_API_KEY = os.getenv("RSS2JSON_API_KEY")
@@ -23,6 +41,73 @@ GOOGLE_CREDENTIALS = os.getenv('GOOGLE_CREDENTIALS')
 SHEET_URL_ID = os.getenv("SHEET_URL_ID")
 BOT_MODE = os.getenv("BOT_MODE", "webhook") # Default to webhook
 
+# Gemini models and request timeout (seconds)
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+GEMINI_MODEL_V2 = os.getenv("GEMINI_MODEL_V2", "gemini-2.5-flash-preview-04-17")
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "60"))
+
+# Minimum seconds between edits of a streamed Telegram reply
+TELEGRAM_EDIT_INTERVAL = float(os.getenv("TELEGRAM_EDIT_INTERVAL", "1.2"))
+
+# Snapshot cache TTL (seconds) for raynor-api sheet endpoints
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+SECTOR_CACHE_TTL = float(os.getenv("SECTOR_CACHE_TTL", "300"))
+CALENDAR_CACHE_TTL = float(os.getenv("CALENDAR_CACHE_TTL", "900"))
+FEED_CACHE_TTL = float(os.getenv("FEED_CACHE_TTL", "60"))
+
+# LLM response cache for /sector and /macro (entries, TTL in seconds)
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "256"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "900"))
+
+# Momentum rankings kept for paging /largecap etc. (entries, TTL in seconds)
+RANKING_CACHE_SIZE = int(os.getenv("RANKING_CACHE_SIZE", "64"))
+RANKING_CACHE_TTL = float(os.getenv("RANKING_CACHE_TTL", "900"))
+
+# Seconds between background refreshes of the precomputed /largecap etc. reports
+REPORT_REFRESH_INTERVAL = float(os.getenv("REPORT_REFRESH_INTERVAL", "300"))
+
+# Pooled HTTP sessions (connection pool size per host, timeouts in seconds)
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+
+# Concurrent upstream fetches (pool threads, seconds /macro waits for feed + calendar)
+UPSTREAM_FETCH_WORKERS = int(os.getenv("UPSTREAM_FETCH_WORKERS", "8"))
+MACRO_FETCH_TIMEOUT = float(os.getenv("MACRO_FETCH_TIMEOUT", "20"))
+
+# Background threads (worker lanes, report scheduler, Sheets exporter, cache refresh):
+# "auto" turns them off under uWSGI started without --enable-threads (e.g. a
+# default PythonAnywhere web app), where daemon threads never run; "off" runs
+# that work synchronously in the request, "on" always uses threads
+BACKGROUND_THREADS = os.getenv("BACKGROUND_THREADS", "auto").lower()
+
+# Webhook worker lanes (fast: static replies, slow: LLM and scoring commands)
+WEBHOOK_FAST_WORKERS = int(os.getenv("WEBHOOK_FAST_WORKERS", "2"))
+WEBHOOK_SLOW_WORKERS = int(os.getenv("WEBHOOK_SLOW_WORKERS", "4"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "100"))
+
+# Admission control for bot commands: per-chat rate (commands per second, burst),
+# tracked chats, seconds between "busy" notices to one chat, and concurrent
+# LLM-backed commands (/sector, /macro) overall, kept below WEBHOOK_SLOW_WORKERS,
+# and per chat
+CHAT_RATE_LIMIT = float(os.getenv("CHAT_RATE_LIMIT", "0.2"))
+CHAT_RATE_BURST = float(os.getenv("CHAT_RATE_BURST", "5"))
+RATE_LIMIT_MAX_CHATS = int(os.getenv("RATE_LIMIT_MAX_CHATS", "10000"))
+RATE_LIMIT_NOTICE_INTERVAL = float(os.getenv("RATE_LIMIT_NOTICE_INTERVAL", "10"))
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "3"))
+LLM_MAX_PER_CHAT = int(os.getenv("LLM_MAX_PER_CHAT", "1"))
+
+# Polling runner (updates processed concurrently, threads for blocking calls)
+POLLING_CONCURRENT_UPDATES = int(os.getenv("POLLING_CONCURRENT_UPDATES", "32"))
+POLLING_BLOCKING_WORKERS = int(os.getenv("POLLING_BLOCKING_WORKERS", "4"))
+
+# Broadcast limits (Telegram allows ~30 msg/s globally and ~1 msg/s per chat)
+BROADCAST_GLOBAL_RATE = float(os.getenv("BROADCAST_GLOBAL_RATE", "28"))
+BROADCAST_PER_CHAT_RATE = float(os.getenv("BROADCAST_PER_CHAT_RATE", "1"))
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "16"))
+BROADCAST_MAX_RETRIES = int(os.getenv("BROADCAST_MAX_RETRIES", "3"))
+
 
 # Webhook Config for PythonAnywhere
 WEBHOOK_USERNAME = "gafarybyh" 
@@ -56,8 +141,9 @@ HELP_MESSAGE = (
     "    _Example: /sector how is DeFi performing today?_\n"
     "  /macro - Ask AI to analyze current macro sentiment\n"
     "    _Example: /macro what is the crypto sentiment of today's news?_\n\n"
-    "📈 **Market Momentum Scan (up to 15 tokens):**\n"
+    "📈 **Market Momentum Scan (15 tokens per page):**\n"
     "  /largecap - Show largecap momentum tokens\n"
+    "    _Example: /largecap 2 for ranks 16-30_\n"
     "  /midcap - Show midcap momentum tokens\n"
     "  /smallcap - Show smallcap momentum tokens\n"
     "  /microcap - Show microcap momentum tokens\n"
@@ -94,6 +180,10 @@ CONTACT_MESSAGE = (
     "We'll respond as soon as possible!"
 )
 
+BUSY_MESSAGE = (
+    "⏳ The bot is busy right now, please try again in a moment."
+)
+
 MACRO_MESSAGE = (
     "This feature is currently under development and will be available soon. Stay tuned!"
 )
@@ -1,20 +1,41 @@
+import asyncio
+import contextvars
 import requests
 import json
 import os
 from datetime import datetime
 import time
-import google.generativeai as genai
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 from helpers.utils import split_text
-from config.app_config import (PROJECT_ROOT, logger, RSS2JSON_API_KEY, SHEET_URL_ID, GEMINI_API_KEY, GOOGLE_CREDENTIALS, TELEGRAM_BOT_TOKEN)
+from helpers.snapshot_cache import SnapshotCache
+from helpers.http_session import http_get, http_post
+from helpers.rate_limit import TokenBucket
+from helpers.gemini_client import generate_text, is_error_response
+from helpers.metrics import track_upstream
+from helpers.worker_pool import background_threads_enabled
+from helpers.subscriber_registry import (
+    add_subscriber, import_exported_subscribers, get_all_subscriber_ids, get_meta, set_meta,
+    count_pending_exports, claim_pending_exports, get_inflight_exports, mark_exported, release_exports
+)
+from config.app_config import (
+    PROJECT_ROOT, logger, RSS2JSON_API_KEY, SHEET_URL_ID, GOOGLE_CREDENTIALS, TELEGRAM_BOT_TOKEN,
+    GEMINI_MODEL, GEMINI_MODEL_V2,
+    TOKEN_CACHE_TTL, SECTOR_CACHE_TTL, CALENDAR_CACHE_TTL, FEED_CACHE_TTL,
+    BROADCAST_GLOBAL_RATE, BROADCAST_PER_CHAT_RATE, BROADCAST_WORKERS, BROADCAST_MAX_RETRIES,
+    GSPREAD_CLIENT_TTL, SHEETS_EXPORT_BATCH_SIZE, SHEETS_EXPORT_INTERVAL, UPSTREAM_FETCH_WORKERS
+)
 
 
 # TODO* FETCH DATA SECTOR
-def fetch_data_sector():
+@track_upstream("sheets_api")
+def _request_data_sector():
     url = f"https://raynor-api.gafarybyh.workers.dev/sheets/{SHEET_URL_ID}/Sector%20Category"
     try:
-        response = requests.get(url) 
+        response = http_get(url)
         response.raise_for_status()  # Memastikan status OK (200)
 
         # Periksa apakah response JSON yang diterima sesuai format yang diharapkan
@@ -34,10 +55,11 @@ def fetch_data_sector():
         return None
 
 # TODO* FETCH DATA TOKEN
-def fetch_data_token():
+@track_upstream("sheets_api")
+def _request_data_token():
     url = f"https://raynor-api.gafarybyh.workers.dev/sheets/{SHEET_URL_ID}/Tokens"
     try:
-        response = requests.get(url)
+        response = http_get(url)
         response.raise_for_status()
         try:
             tokens = response.json()
@@ -55,10 +77,11 @@ def fetch_data_token():
         return None
 
 # TODO* FETCH CALENDAR ECONOMY
-def fetch_calendar_economy():
+@track_upstream("calendar_api")
+def _request_calendar_economy():
     url = "https://raynor-api.gafarybyh.workers.dev/calendar"
     try:
-        response = requests.get(url)
+        response = http_get(url)
         response.raise_for_status()  # Akan raise error kalau status bukan 200 OK
 
         calendar_data = response.json()  # Parse JSON dari respons
@@ -70,8 +93,33 @@ def fetch_calendar_economy():
         logger.error(f"Error: Failed to parse JSON: {e}")
         return None
 
+# TODO* CACHED SHEET SNAPSHOTS
+sector_cache = SnapshotCache("sector", _request_data_sector, SECTOR_CACHE_TTL)
+token_cache = SnapshotCache("token", _request_data_token, TOKEN_CACHE_TTL)
+calendar_cache = SnapshotCache("calendar", _request_calendar_economy, CALENDAR_CACHE_TTL)
+
+def fetch_data_sector():
+    """Sector Category sheet, served from the snapshot cache (read-only)."""
+    return sector_cache.get()
+
+def fetch_data_token(fresh=False):
+    """Tokens sheet, served from the snapshot cache (read-only).
+
+    `fresh=True` reloads it from upstream instead of serving a stale snapshot.
+    """
+    return token_cache.refresh() if fresh else token_cache.get()
+
+def token_snapshot_time():
+    """Unix time at which the cached Tokens sheet was loaded, or None."""
+    return token_cache.loaded_time()
+
+def fetch_calendar_economy():
+    """Economic calendar, served from the snapshot cache (read-only)."""
+    return calendar_cache.get()
+
 # TODO* FETCH FINANCIALJUICE FEED
-def fetch_financialjuice_feed(limit: int = 50):
+@track_upstream("rss2json")
+def _request_financialjuice_feed(limit: int = 50):
     # URL untuk mendapatkan feed dari RSS2JSON API
     url = 'https://api.rss2json.com/v1/api.json'
     params = {
@@ -84,7 +132,7 @@ def fetch_financialjuice_feed(limit: int = 50):
 
     try:
         # Mengambil data dari API
-        response = requests.get(url, params=params)
+        response = http_get(url, params=params)
         response.raise_for_status()  # Mengecek apakah ada error HTTP (misalnya 404, 500)
 
         # Mengambil data JSON dari response
@@ -103,14 +151,86 @@ def fetch_financialjuice_feed(limit: int = 50):
         logger.error(f"Unexpected error while processing FinancialJuice feed: {e}")
         return None
 
+feed_cache = SnapshotCache("feed", _request_financialjuice_feed, FEED_CACHE_TTL)
+
+def fetch_financialjuice_feed(limit: int = 50):
+    """FinancialJuice feed, the default 50 items are served from the snapshot cache (read-only)."""
+    if limit == 50:
+        return feed_cache.get()
+    return _request_financialjuice_feed(limit)
+
+def get_snapshot_cache_stats():
+    """Return hit/miss/age stats for every snapshot cache."""
+    return [cache.stats() for cache in (sector_cache, token_cache, calendar_cache, feed_cache)]
+
+# TODO* CONCURRENT FETCHES (SYNC AND ASYNC)
+# Independent upstream fetches run side by side on one shared pool, so a request
+# waits for its slowest fetch instead of the sum. Sync callers (webhook lanes)
+# and async callers (polling handlers) share the pool; calls that miss the
+# deadline keep running and still fill their snapshot cache for the next request.
+_fetch_executor = ThreadPoolExecutor(max_workers=UPSTREAM_FETCH_WORKERS, thread_name_prefix="upstream-fetch")
+
+def _collect_fetches(futures, done, timeout):
+    results = {}
+    for name, future in futures.items():
+        if future not in done:
+            future.cancel()
+            logger.warning(f"Fetch '{name}' missed the {timeout}s deadline")
+            results[name] = None
+        elif future.exception() is not None:
+            logger.error(f"Fetch '{name}' failed: {future.exception()}")
+            results[name] = None
+        else:
+            results[name] = future.result()
+    return results
+
+def fetch_concurrently(calls: dict, timeout: float):
+    """
+    Run independent fetches concurrently under one shared deadline
+
+    Args:
+        calls (dict): Name -> zero-argument fetch function
+        timeout (float): Seconds to wait for all of them together
+    Returns:
+        dict: Name -> result, None for fetches that failed or missed the deadline
+    """
+    futures = {name: _fetch_executor.submit(contextvars.copy_context().run, fn) for name, fn in calls.items()}
+    done, _ = wait(futures.values(), timeout=timeout)
+    return _collect_fetches(futures, done, timeout)
+
+async def _run_fetch(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_fetch_executor, contextvars.copy_context().run, fn, *args)
+
+async def fetch_concurrently_async(calls: dict, timeout: float):
+    """Async counterpart of `fetch_concurrently`, the event loop stays free while waiting."""
+    futures = {name: asyncio.ensure_future(_run_fetch(fn)) for name, fn in calls.items()}
+    done, _ = await asyncio.wait(futures.values(), timeout=timeout)
+    return _collect_fetches(futures, done, timeout)
+
+async def fetch_data_sector_async():
+    return await _run_fetch(fetch_data_sector)
+
+async def fetch_data_token_async():
+    return await _run_fetch(fetch_data_token)
+
+async def fetch_calendar_economy_async():
+    return await _run_fetch(fetch_calendar_economy)
+
+async def fetch_financialjuice_feed_async(limit: int = 50):
+    return await _run_fetch(fetch_financialjuice_feed, limit)
+
 # TODO* REPLY MESSAGE TELEGRAM
-def reply_message_tg(chat_id: int, text: str):
+@track_upstream("telegram")
+def reply_message_tg(chat_id: int, text: str, parse_mode: str = "Markdown", reply_markup: dict = None):
     """
     Bot reply telegram message
 
     Args:
         chat_id (int): Chat ID to send message
         text (str): Message to send
+        parse_mode (str): Telegram parse mode, None for plain text
+        reply_markup (dict): Inline keyboard etc., attached to the last chunk
     Returns:
         message_id (int): Message ID of the first chunk or None if error
 
@@ -133,11 +253,12 @@ def reply_message_tg(chat_id: int, text: str):
 
     try:
         for i, chunk in enumerate(text_chunks):
-            request = requests.post(url, json={
-                "chat_id": chat_id,
-                "text": chunk,
-                "parse_mode": "Markdown"
-            })
+            payload = {"chat_id": chat_id, "text": chunk}
+            if parse_mode:
+                payload["parse_mode"] = parse_mode
+            if reply_markup and i == len(text_chunks) - 1:
+                payload["reply_markup"] = reply_markup
+            request = http_post(url, json=payload)
             response = request.json()
 
             # Check if the response contains the expected keys
@@ -158,18 +279,123 @@ def reply_message_tg(chat_id: int, text: str):
 
 
 # TODO* BROADCAST MESSAGE
-def broadcast_message_tg(chat_ids: list, text: str):
-    for chat_id in chat_ids:
-        message_id = reply_message_tg(chat_id, text)
-        if message_id:
-            logger.info(f"Message sent to {chat_id}")
+@track_upstream("telegram", operation="broadcast_chunk", outcome=lambda result: result[0])
+def _send_broadcast_chunk(url: str, chat_id: int, chunk: str):
+    """
+    Send one broadcast chunk
+
+    Returns:
+        tuple: (status, detail) where status is "ok", "retry", "rate_limited" or "failed".
+            detail is the message_id, the retry_after seconds or the error text.
+    """
+    try:
+        response = http_post(url, json={
+            "chat_id": chat_id,
+            "text": chunk,
+            "parse_mode": "Markdown"
+        })
+        data = response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        return "retry", str(e)
+
+    if data.get('ok') and 'message_id' in data.get('result', {}):
+        return "ok", data['result']['message_id']
+
+    error_code = data.get('error_code', response.status_code)
+    if error_code == 429:
+        return "rate_limited", data.get('parameters', {}).get('retry_after', 1)
+    if error_code >= 500:
+        return "retry", data.get('description', f"HTTP {error_code}")
+
+    # 400/403 etc. (chat not found, bot blocked) will not succeed on retry
+    return "failed", data.get('description', f"HTTP {error_code}")
+
+def _deliver_broadcast(url: str, chat_id: int, text_chunks: list, global_bucket: TokenBucket):
+    """Deliver all chunks to one chat, honoring global/per-chat limits and retry_after."""
+    chat_bucket = TokenBucket(BROADCAST_PER_CHAT_RATE, capacity=1)
+    result = {"ok": False, "attempts": 0, "message_id": None, "error": None}
+
+    for i, chunk in enumerate(text_chunks):
+        for attempt in range(BROADCAST_MAX_RETRIES + 1):
+            chat_bucket.acquire()
+            global_bucket.acquire()
+            result["attempts"] += 1
+
+            status, detail = _send_broadcast_chunk(url, chat_id, chunk)
+
+            if status == "ok":
+                if i == 0:
+                    result["message_id"] = detail
+                break
+            if status == "failed":
+                result["error"] = detail
+                return result
+            if status == "rate_limited":
+                # Flood control applies to the whole bot, so pause every sender
+                logger.warning(f"Telegram rate limit hit for {chat_id}, retry after {detail}s")
+                global_bucket.pause(float(detail))
+            else:
+                # Exponential backoff with jitter for transient errors
+                time.sleep(min(30, 2 ** attempt) * random.uniform(0.5, 1.5))
+            result["error"] = f"{status}: {detail}"
         else:
-            logger.warning(f"Failed send message to {chat_id}")
-        
-        time.sleep(0.5)  # delay untuk hindari rate limit Telegram
+            return result
+
+    result["ok"] = True
+    result["error"] = None
+    return result
+
+def broadcast_message_tg(chat_ids: list, text: str):
+    """
+    Broadcast a message to many chats concurrently within Telegram rate limits
+
+    Sends run on a thread pool, throttled by a global token bucket
+    (BROADCAST_GLOBAL_RATE msg/s) and a per-chat bucket (BROADCAST_PER_CHAT_RATE
+    msg/s). 429 responses pause all senders for `retry_after` seconds, transient
+    errors are retried with jittered backoff.
+
+    Args:
+        chat_ids (list): Chat IDs to send the message to
+        text (str): Message to send
+    Returns:
+        dict: Delivery report with "sent", "failed", "elapsed" and per-chat "results"
+    """
+    started = time.monotonic()
+    report = {"sent": 0, "failed": 0, "elapsed": 0.0, "results": {}}
+
+    if text is None or not chat_ids:
+        return report
+
+    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    text_chunks = split_text(str(text))
+    global_bucket = TokenBucket(BROADCAST_GLOBAL_RATE)
+
+    with ThreadPoolExecutor(max_workers=BROADCAST_WORKERS, thread_name_prefix="broadcast") as executor:
+        futures = {
+            executor.submit(_deliver_broadcast, url, chat_id, text_chunks, global_bucket): chat_id
+            for chat_id in dict.fromkeys(chat_ids)
+        }
+        for future in as_completed(futures):
+            chat_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"ok": False, "attempts": 0, "message_id": None, "error": str(e)}
+
+            report["results"][chat_id] = result
+            if result["ok"]:
+                report["sent"] += 1
+            else:
+                report["failed"] += 1
+                logger.warning(f"Failed send message to {chat_id}: {result['error']}")
+
+    report["elapsed"] = time.monotonic() - started
+    logger.info(f"Broadcast finished: {report['sent']} sent, {report['failed']} failed in {report['elapsed']:.1f}s")
+    return report
 
 
 # TODO* DELETE MESSAGE TELEGRAM
+@track_upstream("telegram")
 def delete_message_tg(chat_id: int, message_id: int):
     token = TELEGRAM_BOT_TOKEN
     url = f"https://api.telegram.org/bot{token}/deleteMessage"
@@ -178,67 +404,96 @@ def delete_message_tg(chat_id: int, message_id: int):
         "message_id": message_id,
     }
     try:
-        response_data = requests.post(url, json=data)
+        response_data = http_post(url, json=data)
         return response_data.json()
     except Exception as e:
         logger.error(f"Error while DELETE a telegram message: {e}")
 
-# TODO* FETCH GEMINI API
-def get_gemini_response(prompt):
+# TODO* EDIT MESSAGE TELEGRAM
+@track_upstream("telegram")
+def edit_message_tg(chat_id: int, message_id: int, text: str, parse_mode: str = None):
     """
-    Get response from Gemini API
+    Edit the text of a sent telegram message
 
     Args:
-        prompt (str): Prompt to send to Gemini API
+        chat_id (int): Chat ID of the message
+        message_id (int): Message ID to edit
+        text (str): New text (max 4096 chars)
+        parse_mode (str): Telegram parse mode, None for plain text
     Returns:
-        str: Response from Gemini API or error message
+        dict: Telegram API response or None if error
     """
+    token = TELEGRAM_BOT_TOKEN
+    url = f"https://api.telegram.org/bot{token}/editMessageText"
+    data = {
+        "chat_id": chat_id,
+        "message_id": message_id,
+        "text": text,
+    }
+    if parse_mode:
+        data["parse_mode"] = parse_mode
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        response = model.generate_content(prompt)
+        response_data = http_post(url, json=data)
+        return response_data.json()
+    except Exception as e:
+        logger.error(f"Error while EDIT a telegram message: {e}")
+        return None
 
-        # Check if response has text attribute
-        if hasattr(response, 'text'):
-            return response.text.strip()
-        else:
-            logger.error(f"Unexpected response format from Gemini API: {response}")
-            return "Failed to get a valid response from AI, try again later..."
+# TODO* ANSWER CALLBACK QUERY TELEGRAM
+@track_upstream("telegram")
+def answer_callback_query_tg(callback_query_id: str, text: str = None):
+    """
+    Acknowledge an inline button press (stops the loading indicator)
 
+    Args:
+        callback_query_id (str): ID of the callback query
+        text (str): Optional notification shown to the user
+    Returns:
+        dict: Telegram API response or None if error
+    """
+    token = TELEGRAM_BOT_TOKEN
+    url = f"https://api.telegram.org/bot{token}/answerCallbackQuery"
+    data = {"callback_query_id": callback_query_id}
+    if text:
+        data["text"] = text
+    try:
+        response_data = http_post(url, json=data)
+        return response_data.json()
     except Exception as e:
-        logger.error(f"Error occurred while fetching Gemini API: {e}")
-        return "Failed while processing AI response, try again later..."
+        logger.error(f"Error while ANSWER a telegram callback query: {e}")
+        return None
 
 # TODO* FETCH GEMINI API
-def get_gemini_response_v2(prompt):
+@track_upstream("gemini", outcome=lambda result: "error" if is_error_response(result) else "ok")
+def get_gemini_response(prompt, on_chunk=None):
     """
     Get response from Gemini API
 
     Args:
         prompt (str): Prompt to send to Gemini API
+        on_chunk (callable): Optional streaming callback, see generate_text
     Returns:
         str: Response from Gemini API or error message
     """
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-    
-        model = genai.GenerativeModel("gemini-2.5-flash-preview-04-17")
-        response = model.generate_content(prompt)
+    return generate_text(prompt, GEMINI_MODEL, on_chunk=on_chunk)
 
-        # Check if response has text attribute
-        if hasattr(response, 'text'):
-            return response.text.strip()
-        else:
-            logger.error(f"Unexpected response format from Gemini API: {response}")
-            return "Failed to get a valid response from AI, try again later..."
+# TODO* FETCH GEMINI API
+@track_upstream("gemini", outcome=lambda result: "error" if is_error_response(result) else "ok")
+def get_gemini_response_v2(prompt, on_chunk=None):
+    """
+    Get response from Gemini API
 
-    except Exception as e:
-        logger.error(f"Error occurred while fetching Gemini API: {e}")
-        return "Failed while processing AI response, try again later..."
+    Args:
+        prompt (str): Prompt to send to Gemini API
+        on_chunk (callable): Optional streaming callback, see generate_text
+    Returns:
+        str: Response from Gemini API or error message
+    """
+    return generate_text(prompt, GEMINI_MODEL_V2, on_chunk=on_chunk)
 
 
-# TODO* GOOGLE SHEET API CONFIG
-def setup_google_sheets():
+# TODO* GOOGLE SHEET CREDENTIALS
+def _load_google_credentials():
 
     scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
     
@@ -250,9 +505,7 @@ def setup_google_sheets():
     if os.path.exists(creds_path):
         try:
             logger.info(f"Menggunakan credentials dari file: {creds_path}")
-            creds = ServiceAccountCredentials.from_json_keyfile_name(creds_path, scope)
-            client = gspread.authorize(creds)
-            return client
+            return ServiceAccountCredentials.from_json_keyfile_name(creds_path, scope)
         except Exception as e:
             logger.warning(f"Error menggunakan credentials dari file: {e}")
             logger.info("Mencoba fallback ke environment variable...")
@@ -281,60 +534,226 @@ def setup_google_sheets():
             logger.error(f"JSON tidak valid: {e}")
             raise
         
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-        client = gspread.authorize(creds)
-        return client
+        return ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
     except Exception as e:
         logger.error(f"Error menggunakan credentials dari environment variable: {e}")
         raise Exception(f"Tidak dapat mengautentikasi ke Google Sheets: {e}")
 
-# TODO* SAVE TELEGRAM ID TO GOOGLE SHEET
-def save_id_to_google_sheets(chat_id, username):
-    try:
-        client = setup_google_sheets()
+# TODO* GOOGLE SHEET API CONFIG (PROCESS-WIDE CLIENT)
+# Credentials are parsed once, the authorized client and worksheet handles are
+# reused until the access token is about to expire, then re-authorized from the
+# cached credentials.
+_sheets_lock = threading.Lock()
+_google_credentials = None
+_gspread_client = None
+_gspread_authorized_at = 0.0
+_worksheets = {}
+
+def _client_expired():
+    if _gspread_client is None:
+        return True
+    if time.monotonic() - _gspread_authorized_at > GSPREAD_CLIENT_TTL:
+        return True
+    return bool(getattr(_google_credentials, "access_token_expired", False))
+
+def setup_google_sheets():
+    """Return the shared authorized gspread client, refreshing its token when needed."""
+    global _google_credentials, _gspread_client, _gspread_authorized_at
+
+    if not _client_expired():
+        return _gspread_client
+
+    with _sheets_lock:
+        if _client_expired():
+            if _google_credentials is None:
+                _google_credentials = _load_google_credentials()
+            _gspread_client = gspread.authorize(_google_credentials)
+            _gspread_authorized_at = time.monotonic()
+            _worksheets.clear()
+            logger.info("Authorized Google Sheets client")
+        return _gspread_client
+
+def reset_google_sheets():
+    """Drop the cached client and worksheet handles (e.g. after an auth error)."""
+    global _gspread_client
+    with _sheets_lock:
+        _gspread_client = None
+        _worksheets.clear()
+
+def get_worksheet(spreadsheet_name: str, worksheet_name: str):
+    """Return a cached worksheet handle of the shared client."""
+    client = setup_google_sheets()
+    key = (spreadsheet_name, worksheet_name)
+    worksheet = _worksheets.get(key)
+    if worksheet is None:
+        worksheet = client.open(spreadsheet_name).worksheet(worksheet_name)
+        _worksheets[key] = worksheet
+    return worksheet
+
+# TODO* OPEN USER WORKSHEET
+def open_user_worksheet():
+    # Open sheet 'CoinData' then select worksheet
+    return get_worksheet("CoinData", "Elephant Agent User")
+
+# Only the actual Sheets API calls are counted as google_sheets upstream calls
+@track_upstream("google_sheets", outcome=lambda result: "ok")
+def _get_all_values(sheet):
+    return sheet.get_all_values()
+
+@track_upstream("google_sheets", outcome=lambda result: "ok")
+def _append_rows(sheet, rows):
+    return sheet.append_rows(rows)
+
+# TODO* IMPORT EXISTING USERS FROM GOOGLE SHEET (ONE-TIME SEED)
+def import_subscribers_from_sheets(sheet=None):
+    """Seed the local registry with the users already stored in Google Sheets (runs once)."""
+    if get_meta("sheets_imported"):
+        return
+
+    sheet = sheet or open_user_worksheet()
+    rows = []
+    for row in _get_all_values(sheet)[1:]:  # skip header
+        try:
+            rows.append((int(row[0]), row[1] if len(row) > 1 else "", row[2] if len(row) > 2 else ""))
+        except (ValueError, IndexError):
+            logger.warning(f"Invalid chat ID found: {row[:1]}")
+
+    import_exported_subscribers(rows)
+    set_meta("sheets_imported", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    logger.info(f"Imported {len(rows)} users from Google Sheets into local registry")
+
+# TODO* EXPORT NEW USERS TO GOOGLE SHEET (WRITE-BEHIND, BATCHED)
+# New registrations wait in the local registry (durable spool) and are flushed
+# by one background thread with a single append_rows per batch, when
+# SHEETS_EXPORT_BATCH_SIZE rows are pending or SHEETS_EXPORT_INTERVAL seconds
+# have passed since the last flush. Without background threads the same check
+# runs synchronously whenever the exporter would be started or notified.
+_export_lock = threading.Lock()
+_export_wakeup = threading.Event()
+_exporter_lock = threading.Lock()
+_exporter_pid = None
+_last_export_flush = 0.0
+
+def _recover_inflight_exports(sheet):
+    """Resolve rows claimed by a batch that never confirmed (idempotent re-export)."""
+    inflight = get_inflight_exports()
+    if not inflight:
+        return
+
+    existing_ids = set(sheet.col_values(1))
+    done = [row[0] for row in inflight if str(row[0]) in existing_ids]
+    retry = [row[0] for row in inflight if str(row[0]) not in existing_ids]
+    mark_exported(done)
+    release_exports(retry)
+    logger.info(f"Recovered in-flight exports: {len(done)} already in sheet, {len(retry)} re-queued")
+
+def export_subscribers_to_sheets():
+    """
+    Flush pending registrations to Google Sheets, one append_rows per batch
+
+    Returns:
+        int: Number of exported rows
+    """
+    if not _export_lock.acquire(blocking=False):
+        return 0  # Another flush is running and will pick up pending rows
 
-        # Open sheet 'CoinData' then select worksheet
-        sheet = client.open("CoinData").worksheet("Elephant Agent User")
+    exported = 0
+    try:
+        sheet = open_user_worksheet()
+        import_subscribers_from_sheets(sheet)
 
         # Tambahkan header (opsional) jika belum ada
         if sheet.cell(1, 1).value is None:  # Jika sel A1 kosong
             sheet.update("A1", [["Chat ID", "Username", "Timestamp"]])
 
-        # Periksa apakah Chat ID sudah ada
-        chat_ids = sheet.col_values(1)  # Ambil semua Chat ID dari kolom A
-        if str(chat_id) in chat_ids:
-            # print(f"Chat ID {chat_id} sudah terdaftar. Tidak menambahkan.")
+        _recover_inflight_exports(sheet)
+
+        while True:
+            batch = claim_pending_exports(SHEETS_EXPORT_BATCH_SIZE)
+            if not batch:
+                break
+            # Rows stay in-flight if append_rows fails, the next flush dedups them
+            _append_rows(sheet, [[chat_id, username, created_at] for chat_id, username, created_at in batch])
+            mark_exported([row[0] for row in batch])
+            exported += len(batch)
+
+        if exported:
+            logger.info(f"Exported {exported} new users to Google Sheets")
+        return exported
+    except Exception as e:
+        logger.error(f"Error exporting users to Google Sheets: {e}")
+        reset_google_sheets()
+        return exported
+    finally:
+        _export_lock.release()
+
+def _flush_due_exports():
+    """Export pending rows if a full batch is waiting or the export interval has passed."""
+    global _last_export_flush
+    try:
+        pending = count_pending_exports() + len(get_inflight_exports())
+        if not pending:
             return
-        
-        logger.info(f"Saving user {chat_id} with username {username} to Google Sheets")
-        
-        # Menambahkan data ke baris berikutnya mulai dari baris kedua
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        sheet.append_row([chat_id, username, timestamp])
-        
-        logger.info(f"Successfully saved user {chat_id} to Google Sheets")
+        if pending >= SHEETS_EXPORT_BATCH_SIZE or time.monotonic() - _last_export_flush >= SHEETS_EXPORT_INTERVAL:
+            export_subscribers_to_sheets()
+            _last_export_flush = time.monotonic()
+    except Exception as e:
+        logger.error(f"Error in Google Sheets export loop: {e}")
+
+def _sheets_export_loop():
+    while True:
+        _export_wakeup.wait(timeout=SHEETS_EXPORT_INTERVAL)
+        _export_wakeup.clear()
+        _flush_due_exports()
+
+def start_sheets_exporter():
+    """Start the write-behind export thread once per process (also flushes rows spooled before a restart)."""
+    global _exporter_pid
+    if not background_threads_enabled():
+        _flush_due_exports()
+        return
+    if _exporter_pid == os.getpid():
+        return
+    with _exporter_lock:
+        if _exporter_pid != os.getpid():
+            threading.Thread(target=_sheets_export_loop, name="sheets-export", daemon=True).start()
+            _exporter_pid = os.getpid()
+
+def schedule_sheets_export():
+    """Notify the write-behind exporter that new rows are pending."""
+    start_sheets_exporter()
+    if background_threads_enabled():
+        _export_wakeup.set()
+
+# TODO* SAVE TELEGRAM ID
+def save_id_to_google_sheets(chat_id, username):
+    """
+    Register a Telegram user in the local registry
+
+    New users are exported to Google Sheets asynchronously, so this never waits
+    on the Sheets API.
+    """
+    try:
+        if add_subscriber(chat_id, username):
+            logger.info(f"Registered new user {chat_id} with username {username}")
+            schedule_sheets_export()
     except Exception as e:
-        logger.error(f"Error saving user ID to Google Sheets: {e}")
+        logger.error(f"Error saving user ID: {e}")
         # Continue execution without raising the exception
 
-# TODO* GET ALL CHAT IDs FROM GOOGLE SHEET
+# TODO* GET ALL CHAT IDs
 def get_all_chat_ids_from_sheets():
+    """Return all registered chat IDs from the local registry."""
     try:
-        client = setup_google_sheets()
-        sheet = client.open("CoinData").worksheet("Elephant Agent User")
-
-        chat_ids = sheet.col_values(1)[1:]  # skip header
-        valid_chat_ids = []
-
-        for cid in chat_ids:
-            try:
-                cid_int = int(cid)
-                valid_chat_ids.append(cid_int)
-            except ValueError:
-                logger.warning(f"Invalid chat ID found: {cid}")
+        try:
+            import_subscribers_from_sheets()
+        except Exception as e:
+            logger.error(f"Error importing users from Google Sheets: {e}")
 
-        logger.info(f"Retrieved {len(valid_chat_ids)} valid chat IDs from sheets")
-        return valid_chat_ids
+        start_sheets_exporter()
+        chat_ids = get_all_subscriber_ids()
+        logger.info(f"Retrieved {len(chat_ids)} chat IDs from local registry")
+        return chat_ids
     except Exception as e:
-        logger.error(f"Error retrieving chat IDs from sheets: {e}")
+        logger.error(f"Error retrieving chat IDs: {e}")
         return []  # Return empty list instead of None on error
@@ -0,0 +1,144 @@
+import threading
+import time
+import google.generativeai as genai
+from config.app_config import logger, GEMINI_API_KEY, GEMINI_TIMEOUT
+
+# TODO* GEMINI CLIENT
+# genai is configured once per process and model handles are cached by
+# (model name, generation config), so requests only pay for the API call.
+_configure_lock = threading.Lock()
+_configured = False
+
+_models = {}
+_models_lock = threading.Lock()
+
+_latency_stats = {}
+_stats_lock = threading.Lock()
+
+AI_INVALID_RESPONSE_MESSAGE = "Failed to get a valid response from AI, try again later..."
+AI_ERROR_MESSAGE = "Failed while processing AI response, try again later..."
+
+def is_error_response(text) -> bool:
+    """True if `text` is one of the fallback messages returned on Gemini failure."""
+    return text in (AI_INVALID_RESPONSE_MESSAGE, AI_ERROR_MESSAGE)
+
+def _ensure_configured():
+    global _configured
+    if _configured:
+        return
+    with _configure_lock:
+        if not _configured:
+            genai.configure(api_key=GEMINI_API_KEY)
+            _configured = True
+
+def _config_key(generation_config):
+    if not generation_config:
+        return ()
+    return tuple(sorted(generation_config.items()))
+
+def get_model(model_name: str, generation_config: dict = None):
+    """
+    Get a cached GenerativeModel handle
+
+    Args:
+        model_name (str): Gemini model name, e.g. "gemini-2.0-flash"
+        generation_config (dict): Optional generation config (temperature, etc.)
+    Returns:
+        genai.GenerativeModel: Shared model handle
+    """
+    key = (model_name, _config_key(generation_config))
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    _ensure_configured()
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            model = genai.GenerativeModel(model_name, generation_config=generation_config)
+            _models[key] = model
+        return model
+
+def _record_latency(model_name: str, seconds: float, ok: bool):
+    with _stats_lock:
+        stats = _latency_stats.setdefault(model_name, {
+            "calls": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0, "last_seconds": 0.0
+        })
+        stats["calls"] += 1
+        stats["total_seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        stats["last_seconds"] = seconds
+        if not ok:
+            stats["errors"] += 1
+
+def get_gemini_stats():
+    """Return call count, error count and latency per model."""
+    with _stats_lock:
+        return {
+            model_name: dict(stats, avg_seconds=stats["total_seconds"] / stats["calls"])
+            for model_name, stats in _latency_stats.items()
+        }
+
+def _stream_content(model, prompt, timeout, on_chunk):
+    """Consume a streamed response, calling on_chunk with the text received so far."""
+    response = model.generate_content(prompt, stream=True, request_options={"timeout": timeout})
+    parts = []
+    for chunk in response:
+        try:
+            part = chunk.text
+        except (ValueError, AttributeError):
+            continue  # e.g. chunk without text parts (safety metadata)
+        if not part:
+            continue
+        parts.append(part)
+        try:
+            on_chunk("".join(parts))
+        except Exception as e:
+            logger.error(f"Error in Gemini stream callback: {e}")
+    return "".join(parts) if parts else None
+
+def generate_text(prompt, model_name: str, generation_config: dict = None, timeout: float = GEMINI_TIMEOUT, on_chunk=None):
+    """
+    Generate a text response from Gemini
+
+    Args:
+        prompt (str): Prompt to send to Gemini API
+        model_name (str): Gemini model name
+        generation_config (dict): Optional generation config
+        timeout (float): Request timeout in seconds
+        on_chunk (callable): If given, the response is streamed and on_chunk is
+            called with the accumulated text after every received chunk
+    Returns:
+        str: Response from Gemini API or error message
+    """
+    started = time.monotonic()
+    ok = False
+    try:
+        model = get_model(model_name, generation_config)
+
+        if on_chunk is not None:
+            text = _stream_content(model, prompt, timeout, on_chunk)
+            if text is not None:
+                ok = True
+                return text.strip()
+
+            logger.error(f"Empty streamed response from Gemini API ({model_name})")
+            return AI_INVALID_RESPONSE_MESSAGE
+
+        response = model.generate_content(prompt, request_options={"timeout": timeout})
+
+        # Check if response has text attribute
+        if hasattr(response, 'text'):
+            ok = True
+            return response.text.strip()
+
+        logger.error(f"Unexpected response format from Gemini API: {response}")
+        return AI_INVALID_RESPONSE_MESSAGE
+
+    except Exception as e:
+        logger.error(f"Error occurred while fetching Gemini API ({model_name}): {e}")
+        return AI_ERROR_MESSAGE
+    finally:
+        elapsed = time.monotonic() - started
+        _record_latency(model_name, elapsed, ok)
+        logger.info(f"Gemini {model_name} responded in {elapsed:.2f}s")
@@ -0,0 +1,56 @@
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from config.app_config import logger, HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+
+# TODO* POOLED KEEP-ALIVE HTTP SESSIONS
+# One requests.Session per host, so TCP/TLS connections are reused across calls
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+def get_session(url: str):
+    """
+    Get the shared keep-alive session for the host of `url`
+
+    Args:
+        url (str): Any URL on the target host
+    Returns:
+        requests.Session: Session with its own connection pool for that host
+    """
+    parts = urlsplit(url)
+    host_key = f"{parts.scheme}://{parts.netloc}"
+
+    session = _sessions.get(host_key)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(host_key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host_key] = session
+            logger.debug(f"Created pooled HTTP session for {host_key}")
+        return session
+
+def http_get(url: str, **kwargs):
+    """GET through the pooled session of the host, with a default timeout"""
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return get_session(url).get(url, **kwargs)
+
+def http_post(url: str, **kwargs):
+    """POST through the pooled session of the host, with a default timeout"""
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return get_session(url).post(url, **kwargs)
+
+def close_sessions():
+    """Close every pooled session (e.g. on shutdown)"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
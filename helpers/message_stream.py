@@ -0,0 +1,86 @@
+import threading
+import time
+from helpers.utils import split_text
+from helpers.api_helpers import reply_message_tg, edit_message_tg, delete_message_tg
+from config.app_config import logger, TELEGRAM_EDIT_INTERVAL
+
+# TODO* PROGRESSIVE TELEGRAM MESSAGE (STREAMED AI OUTPUT)
+class ProgressiveMessage:
+    """
+    Render a growing text into Telegram messages with throttled edits.
+
+    `update` is meant as the `on_chunk` callback of a streamed Gemini call:
+    it edits the placeholder message at most once per `min_interval` seconds,
+    and rolls over to a new message every 4096 chars. Intermediate edits are
+    plain text because partial Markdown is often unbalanced; `finish` renders
+    the final text with Markdown (falling back to plain text if Telegram
+    rejects it).
+
+    Args:
+        chat_id (int): Chat to write to
+        message_id (int): Placeholder message to edit first (None to send a new one)
+        min_interval (float): Minimum seconds between edit rounds
+    """
+
+    def __init__(self, chat_id, message_id, min_interval=TELEGRAM_EDIT_INTERVAL):
+        self.chat_id = chat_id
+        self.message_ids = [message_id] if message_id is not None else []
+        self.min_interval = min_interval
+        self._sent = {}
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, text):
+        """Show the text received so far, throttled to Telegram's edit limits."""
+        with self._lock:
+            if time.monotonic() - self._last_flush < self.min_interval:
+                return
+            self._render(text, parse_mode=None)
+
+    def finish(self, text):
+        """Render the final text with Markdown and drop leftover messages."""
+        with self._lock:
+            self._render(str(text), parse_mode="Markdown")
+
+    def _edit(self, message_id, segment, parse_mode):
+        response = edit_message_tg(self.chat_id, message_id, segment, parse_mode=parse_mode)
+        if response and (response.get("ok") or "not modified" in response.get("description", "")):
+            return True
+        if parse_mode:
+            logger.warning(f"Markdown edit rejected for {self.chat_id}, retrying as plain text: {response}")
+            return self._edit(message_id, segment, None)
+        return False
+
+    def _send(self, segment, parse_mode):
+        message_id = reply_message_tg(self.chat_id, segment, parse_mode=parse_mode)
+        if message_id is None and parse_mode:
+            message_id = reply_message_tg(self.chat_id, segment, parse_mode=None)
+        return message_id
+
+    def _render(self, text, parse_mode):
+        segments = split_text(text) or [""]
+        final = parse_mode is not None
+
+        for i, segment in enumerate(segments):
+            if not segment.strip():
+                continue
+            if i < len(self.message_ids):
+                message_id = self.message_ids[i]
+                if not final and self._sent.get(message_id) == segment:
+                    continue
+                self._edit(message_id, segment, parse_mode)
+            else:
+                # Current message is full, roll over to a new one
+                message_id = self._send(segment, parse_mode)
+                if message_id is None:
+                    break
+                self.message_ids.append(message_id)
+            self._sent[message_id] = segment
+
+        if final:
+            # Final text can be shorter than what was streamed
+            for message_id in self.message_ids[len(segments):]:
+                delete_message_tg(self.chat_id, message_id)
+            self.message_ids = self.message_ids[:len(segments)]
+
+        self._last_flush = time.monotonic()
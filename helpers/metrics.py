@@ -0,0 +1,227 @@
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# TODO* METRICS (PROMETHEUS TEXT FORMAT)
+# Minimal in-process counters and histograms, rendered in the Prometheus text
+# exposition format by `render_prometheus` (served at /metrics by the webhook
+# app). Each process keeps its own values.
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in sorted(values.items())]
+
+
+class Histogram:
+    """Histogram with fixed cumulative buckets and labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            values = {key: list(state) for key, state in self._values.items()}
+
+        samples = []
+        for key, state in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                samples.append((f"{self.name}_bucket", labels, cumulative))
+            labels = _format_labels(self.labelnames, key)
+            samples.append((f"{self.name}_sum", labels, state[-1]))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """Ordered collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+upstream_latency = registry.register(Histogram(
+    "elephant_upstream_request_seconds", "Latency of api_helpers calls to upstream services",
+    ("upstream", "operation", "command")
+))
+upstream_requests = registry.register(Counter(
+    "elephant_upstream_requests_total", "api_helpers calls to upstream services by outcome",
+    ("upstream", "operation", "command", "outcome")
+))
+# Stages (see `track_stage`):
+#   sector:   fetch_data, format_rows, build_prompt, llm
+#   macro:    fetch_inputs, classify, build_prompt, llm
+#   momentum: fetch_data, parse_columns, history_lookup, score, history_record,
+#             format, precompute
+stage_latency = registry.register(Histogram(
+    "elephant_analysis_stage_seconds", "Latency of analysis pipeline stages",
+    ("analysis", "stage", "command")
+))
+cache_requests = registry.register(Counter(
+    "elephant_snapshot_cache_requests_total", "Snapshot cache reads by result (hit, stale, miss)",
+    ("cache", "result")
+))
+command_latency = registry.register(Histogram(
+    "elephant_command_seconds", "End-to-end latency of bot commands", ("command",)
+))
+command_requests = registry.register(Counter(
+    "elephant_commands_total", "Bot commands handled by outcome", ("command", "outcome")
+))
+
+# Command being handled by the current thread / task, attached to every metric
+_current_command = contextvars.ContextVar("metrics_command", default="none")
+
+
+def current_command():
+    return _current_command.get()
+
+
+@contextmanager
+def track_command(command):
+    """Time a bot command and label nested upstream/stage metrics with it."""
+    token = _current_command.set(command)
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        command_latency.observe(time.perf_counter() - started, command=command)
+        command_requests.inc(command=command, outcome=outcome)
+        _current_command.reset(token)
+
+
+@contextmanager
+def track_stage(analysis, stage):
+    """Time one stage of an analysis pipeline."""
+    with stage_latency.time(analysis=analysis, stage=stage, command=current_command()):
+        yield
+
+
+def _default_outcome(result):
+    # api_helpers functions return None when the call failed
+    return "error" if result is None else "ok"
+
+
+def track_upstream(upstream, operation=None, outcome=_default_outcome):
+    """
+    Decorator timing and counting an upstream call
+
+    Args:
+        upstream (str): Upstream service label (telegram, gemini, sheets_api, ...)
+        operation (str): Operation label, defaults to the function name
+        outcome (callable): Maps the result to the outcome label, a raised
+            exception is always "error"
+    """
+    def decorator(fn):
+        label = operation or fn.__name__.lstrip("_")
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            command = current_command()
+            started = time.perf_counter()
+            status = "error"
+            try:
+                result = fn(*args, **kwargs)
+                status = outcome(result)
+                return result
+            finally:
+                upstream_latency.observe(time.perf_counter() - started, upstream=upstream, operation=label, command=command)
+                upstream_requests.inc(upstream=upstream, operation=label, command=command, outcome=status)
+        return wrapper
+    return decorator
+
+
+def render_prometheus():
+    """All metrics of this process in the Prometheus text format."""
+    return registry.render()
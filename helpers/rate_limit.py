@@ -0,0 +1,193 @@
+import threading
+import time
+from collections import OrderedDict
+from config.app_config import (
+    CHAT_RATE_LIMIT, CHAT_RATE_BURST, RATE_LIMIT_MAX_CHATS, RATE_LIMIT_NOTICE_INTERVAL, LLM_MAX_CONCURRENT,
+    LLM_MAX_PER_CHAT
+)
+
+# TODO* TOKEN BUCKET RATE LIMITER
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens refill continuously at `rate` per second up to `capacity`. A bucket
+    can also be paused (e.g. after Telegram answers 429 with `retry_after`),
+    during which no tokens are handed out.
+
+    Args:
+        rate (float): Tokens added per second
+        capacity (float): Maximum burst size (defaults to `rate`, at least 1)
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+
+    def _wait_time(self, tokens, now):
+        """Seconds until `tokens` can be taken, 0 if they were taken now."""
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._refill(now)
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return 0.0
+        return (tokens - self._tokens) / self.rate
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available right now, never blocks."""
+        with self._lock:
+            return self._wait_time(tokens, time.monotonic()) == 0.0
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Block until tokens are available
+
+        Returns:
+            bool: False if `timeout` seconds passed first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._wait_time(tokens, now)
+            if wait == 0.0:
+                return True
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hand out no tokens for the next `seconds` seconds."""
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            # Start refilling only once the pause is over
+            self._tokens = 0.0
+            self._updated_at = self._paused_until
+
+
+# TODO* PER-CHAT RATE LIMIT (ADMISSION CONTROL)
+class ChatRateLimiter:
+    """
+    One token bucket per chat, so a single chat cannot flood the bot.
+
+    Buckets of the least recently seen chats are dropped beyond `max_chats`
+    (a dropped chat starts again with a full bucket). Rejected chats should get
+    at most one notice per `notice_interval` seconds, so a flood does not turn
+    into a flood of replies.
+
+    Args:
+        rate (float): Commands per second allowed per chat
+        burst (float): Commands a chat may send at once
+        max_chats (int): Maximum number of tracked chats
+        notice_interval (float): Minimum seconds between notices to one chat
+    """
+
+    def __init__(self, rate, burst, max_chats=10_000, notice_interval=10.0):
+        self.rate = rate
+        self.burst = burst
+        self.max_chats = max_chats
+        self.notice_interval = notice_interval
+        self._buckets = OrderedDict()  # chat_id -> [TokenBucket, last notice]
+        self._lock = threading.Lock()
+        self._rejected = 0
+
+    def _entry(self, chat_id):
+        entry = self._buckets.get(chat_id)
+        if entry is None:
+            entry = self._buckets[chat_id] = [TokenBucket(self.rate, capacity=self.burst), 0.0]
+            while len(self._buckets) > self.max_chats:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(chat_id)
+        return entry
+
+    def allow(self, chat_id):
+        """Take one token from the chat's bucket, never blocks."""
+        with self._lock:
+            bucket = self._entry(chat_id)[0]
+        if bucket.try_acquire():
+            return True
+        with self._lock:
+            self._rejected += 1
+        return False
+
+    def should_notify(self, chat_id):
+        """True if a rejected chat has not been told so in the last `notice_interval` seconds."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entry(chat_id)
+            if now - entry[1] < self.notice_interval:
+                return False
+            entry[1] = now
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {"chats": len(self._buckets), "rejected": self._rejected}
+
+
+# TODO* CONCURRENCY LIMIT
+class ConcurrencyLimit:
+    """
+    Non-blocking cap on concurrent jobs: `try_acquire` fails fast when all
+    `limit` slots are taken, or when `key` (e.g. a chat) already holds
+    `per_key_limit` of them. Every successful acquire must be released with
+    the same key.
+
+    Args:
+        limit (int): Maximum number of concurrent jobs
+        per_key_limit (int): Maximum concurrent jobs per key (None: no limit)
+    """
+
+    def __init__(self, limit, per_key_limit=None):
+        self.limit = limit
+        self.per_key_limit = per_key_limit
+        self._per_key = {}
+        self._lock = threading.Lock()
+        self._active = 0
+        self._rejected = 0
+
+    def try_acquire(self, key=None):
+        with self._lock:
+            held = self._per_key.get(key, 0)
+            if self._active >= self.limit or (
+                key is not None and self.per_key_limit is not None and held >= self.per_key_limit
+            ):
+                self._rejected += 1
+                return False
+            self._active += 1
+            if key is not None:
+                self._per_key[key] = held + 1
+            return True
+
+    def release(self, key=None):
+        with self._lock:
+            self._active -= 1
+            if key is not None:
+                held = self._per_key.pop(key, 1) - 1
+                if held > 0:
+                    self._per_key[key] = held
+
+    def stats(self):
+        with self._lock:
+            return {"limit": self.limit, "active": self._active, "rejected": self._rejected}
+
+
+# Shared by the webhook and polling command handlers
+command_rate_limiter = ChatRateLimiter(
+    CHAT_RATE_LIMIT, CHAT_RATE_BURST, max_chats=RATE_LIMIT_MAX_CHATS, notice_interval=RATE_LIMIT_NOTICE_INTERVAL
+)
+# LLM-backed commands (/sector, /macro) admitted at once (queued or running), overall and per chat
+llm_command_slots = ConcurrencyLimit(LLM_MAX_CONCURRENT, per_key_limit=LLM_MAX_PER_CHAT)
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from config.app_config import LLM_CACHE_SIZE, LLM_CACHE_TTL
+
+# TODO* CONTENT-ADDRESSED RESPONSE CACHE
+def normalize_question(question):
+    """Lowercase, trim and collapse whitespace so equivalent questions share a key."""
+    if not question:
+        return ""
+    return re.sub(r"\s+", " ", question).strip().lower()
+
+def make_cache_key(*parts):
+    """SHA-256 of the JSON-serialized parts (data snapshot, question, ...)."""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache with a TTL per entry.
+
+    Keys are content hashes of the input data plus the normalized question,
+    so a change in the underlying data naturally misses the cache; the TTL
+    only bounds how long an answer for unchanged data is reused.
+
+    Args:
+        max_entries (int): Maximum number of cached responses
+        ttl (float): Time-to-live in seconds
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key):
+        """Return the cached response or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() >= entry[1]:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key, value, ttl=None):
+        """Store a response, evicting the least recently used entries."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def stats(self):
+        """Return hit/miss/eviction counters and the current size."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
+
+# Shared cache for LLM answers of /sector and /macro
+llm_response_cache = ResponseCache(LLM_CACHE_SIZE, LLM_CACHE_TTL)
@@ -0,0 +1,148 @@
+import contextvars
+import threading
+from config.app_config import logger
+from helpers.worker_pool import background_threads_enabled
+
+# TODO* SINGLE-FLIGHT REQUEST COALESCING
+class _Flight:
+    """One in-flight computation, its result and the latest streamed text."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self._text = None
+        self._version = 0
+        self._changed = threading.Condition()
+
+    def publish(self, text):
+        """Store the latest streamed text, never waits for the subscribers."""
+        with self._changed:
+            self._text = text
+            self._version += 1
+            self._changed.notify_all()
+
+    def land(self):
+        with self._changed:
+            self.done.set()
+            self._changed.notify_all()
+
+    def pump(self, on_chunk):
+        """
+        Forward streamed text to `on_chunk` on the calling thread until the flight lands.
+
+        Every subscriber runs at its own pace: when `on_chunk` is slower than
+        the stream it gets the latest text and skips the ones in between. A late
+        joiner first gets the text received so far.
+        """
+        seen = 0
+        while True:
+            with self._changed:
+                while self._version == seen and not self.done.is_set():
+                    self._changed.wait()
+                if self.done.is_set():
+                    return
+                seen, text = self._version, self._text
+            self.deliver(on_chunk, text)
+
+    @staticmethod
+    def deliver(on_chunk, text):
+        try:
+            on_chunk(text)
+        except Exception as e:
+            logger.error(f"Error in single-flight stream callback: {e}")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls into one computation.
+
+    The first caller for a key (the leader) runs the function; callers arriving
+    while it is in flight wait for it and receive the same result (or
+    exception). Streamed text (accumulated, as passed to `on_chunk`) is
+    forwarded to every caller that passed an `on_chunk`, late joiners first get
+    the text received so far. The leader's stream only stores the latest text:
+    each follower runs its own `on_chunk` on its own (otherwise waiting) thread
+    and the leader's runs on a helper thread (inline without background
+    threads), so a slow chat never holds back the stream or the other chats. Nothing is kept once the flight lands:
+    results are cached elsewhere (see `llm_response_cache`).
+
+    Args:
+        name (str): Name used in stats
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._leaders = 0
+        self._followers = 0
+
+    def do(self, key, fn, on_chunk=None):
+        """
+        Run `fn` once for all concurrent callers of `key`
+
+        Args:
+            key (str): Identity of the computation (command + normalized query)
+            fn (callable): fn(on_chunk) -> result, on_chunk is None unless the
+                leader streams
+            on_chunk (callable): Optional stream callback of this caller
+        Returns:
+            The result of the leader's call
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._leaders += 1
+            else:
+                self._followers += 1
+
+        if not leader:
+            if on_chunk is not None:
+                flight.pump(on_chunk)
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        streamer = None
+        publish = None
+        if on_chunk is not None and background_threads_enabled():
+            context = contextvars.copy_context()
+            streamer = threading.Thread(target=context.run, args=(flight.pump, on_chunk), name=f"{self.name}-stream", daemon=True)
+            streamer.start()
+            publish = flight.publish
+        elif on_chunk is not None:
+            # No helper thread, the leader's own callback runs on the stream
+            def publish(text):
+                flight.publish(text)
+                _Flight.deliver(on_chunk, text)
+
+        try:
+            flight.result = fn(publish)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.land()
+            if streamer is not None:
+                # No stream edit may land after the caller renders the final text
+                streamer.join()
+
+    def stats(self):
+        """Return leader/follower counters and the number of flights in the air."""
+        with self._lock:
+            return {
+                "name": self.name,
+                "in_flight": len(self._flights),
+                "leaders": self._leaders,
+                "followers": self._followers,
+            }
+
+# Shared by /macro and /sector, keys start with the command
+command_flights = SingleFlight("commands")
@@ -0,0 +1,140 @@
+import threading
+import time
+from config.app_config import logger
+from helpers.metrics import cache_requests
+from helpers.worker_pool import background_threads_enabled
+
+# TODO* SNAPSHOT CACHE (TTL + STALE-WHILE-REVALIDATE)
+class SnapshotCache:
+    """
+    Thread-safe in-process cache for a single upstream snapshot.
+
+    Fresh entries (younger than `ttl` seconds) are returned directly. Expired
+    entries are still returned while exactly one background thread refreshes
+    them. Only a cold cache blocks the caller, and concurrent cold callers
+    share a single upstream call. Without background threads (see
+    `background_threads_enabled`) an expired entry is reloaded in the caller
+    instead. `refresh()` bypasses stale-while-revalidate
+    for callers that need current data (e.g. a scheduled precompute).
+
+    The loader must return None on failure; failures are never cached and the
+    previous snapshot keeps being served. Cached snapshots are shared between
+    callers and must be treated as read-only.
+
+    Args:
+        name (str): Name used in logs and stats
+        loader (callable): Function that fetches the snapshot from upstream
+        ttl (float): Time-to-live in seconds
+    """
+
+    def __init__(self, name, loader, ttl):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self._value = None
+        self._loaded_at = None
+        self._loaded_time = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._refreshing = False
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._refreshes = 0
+        self._errors = 0
+
+    def get(self):
+        """Return the cached snapshot, loading or refreshing it as needed."""
+        expired = False
+        with self._lock:
+            if self._value is not None:
+                if time.monotonic() - self._loaded_at < self.ttl:
+                    self._hits += 1
+                    cache_requests.inc(cache=self.name, result="hit")
+                    return self._value
+
+                self._stale_hits += 1
+                cache_requests.inc(cache=self.name, result="stale")
+                if background_threads_enabled():
+                    # Serve stale value, refresh in background (only one at a time)
+                    if not self._refreshing:
+                        self._refreshing = True
+                        threading.Thread(target=self._background_refresh, name=f"{self.name}-refresh", daemon=True).start()
+                    return self._value
+                expired = True
+            else:
+                self._misses += 1
+                cache_requests.inc(cache=self.name, result="miss")
+
+        if expired:
+            # No background thread to refresh it, reload in the caller
+            return self.refresh()
+
+        # Cold cache: load synchronously, concurrent callers wait for one load
+        with self._load_lock:
+            with self._lock:
+                if self._value is not None:
+                    return self._value
+            return self._load()
+
+    def refresh(self):
+        """Load the snapshot from upstream now and return it (the previous one if the load fails)."""
+        with self._lock:
+            requested_at = time.monotonic()
+        with self._load_lock:
+            with self._lock:
+                # A load that finished while waiting for the lock is fresh enough
+                if self._loaded_at is not None and self._loaded_at >= requested_at:
+                    return self._value
+            return self._load()
+
+    def loaded_time(self):
+        """Unix time at which the cached snapshot was loaded, or None."""
+        with self._lock:
+            return self._loaded_time
+
+    def invalidate(self):
+        """Drop the cached snapshot, the next call loads from upstream."""
+        with self._lock:
+            self._value = None
+            self._loaded_at = None
+            self._loaded_time = None
+
+    def stats(self):
+        """Return hit/miss counters and the age of the cached snapshot."""
+        with self._lock:
+            age = None if self._loaded_at is None else time.monotonic() - self._loaded_at
+            return {
+                "name": self.name,
+                "ttl": self.ttl,
+                "age": age,
+                "fresh": age is not None and age < self.ttl,
+                "hits": self._hits,
+                "stale_hits": self._stale_hits,
+                "misses": self._misses,
+                "refreshes": self._refreshes,
+                "errors": self._errors,
+                "refreshing": self._refreshing,
+            }
+
+    def _load(self):
+        value = self.loader()
+        with self._lock:
+            self._refreshes += 1
+            if value is None:
+                self._errors += 1
+                return self._value
+            self._value = value
+            self._loaded_at = time.monotonic()
+            self._loaded_time = time.time()
+            return value
+
+    def _background_refresh(self):
+        try:
+            with self._load_lock:
+                self._load()
+        except Exception as e:
+            logger.error(f"Error refreshing {self.name} cache: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
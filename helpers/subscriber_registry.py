@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from config.app_config import SUBSCRIBER_DB_PATH
+
+# TODO* LOCAL SUBSCRIBER REGISTRY (SQLITE)
+# Chat IDs live in a local SQLite table keyed by chat_id (indexed primary key),
+# Google Sheets is only an export target. The table doubles as the durable
+# spool of the Sheets write-behind queue via the `exported` state.
+EXPORT_PENDING = 0   # Registered locally, not yet sent to Google Sheets
+EXPORT_DONE = 1      # Present in Google Sheets
+EXPORT_INFLIGHT = 2  # Claimed by a batch; unknown if append_rows succeeded
+_init_lock = threading.Lock()
+_initialized_path = None
+
+def _connect():
+    global _initialized_path
+    if _initialized_path != SUBSCRIBER_DB_PATH:
+        ensure_registry_dir()
+    conn = sqlite3.connect(SUBSCRIBER_DB_PATH, timeout=10)
+    if _initialized_path != SUBSCRIBER_DB_PATH:
+        with _init_lock:
+            if _initialized_path != SUBSCRIBER_DB_PATH:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS subscribers ("
+                    " chat_id INTEGER PRIMARY KEY,"
+                    " username TEXT,"
+                    " created_at TEXT NOT NULL,"
+                    " exported INTEGER NOT NULL DEFAULT 0)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_subscribers_pending ON subscribers (exported) WHERE exported = 0")
+                conn.execute("CREATE TABLE IF NOT EXISTS registry_meta (key TEXT PRIMARY KEY, value TEXT)")
+                conn.commit()
+                _initialized_path = SUBSCRIBER_DB_PATH
+    return conn
+
+def ensure_registry_dir():
+    """Create the directory of the SQLite file if needed."""
+    directory = os.path.dirname(SUBSCRIBER_DB_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+def add_subscriber(chat_id, username, exported=False):
+    """
+    Register a chat ID
+
+    Args:
+        chat_id (int): Telegram chat ID
+        username (str): Telegram username (may be empty)
+        exported (bool): True if the row already exists in Google Sheets
+    Returns:
+        bool: True if the chat ID was new
+    """
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn = _connect()
+    try:
+        with conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO subscribers (chat_id, username, created_at, exported) VALUES (?, ?, ?, ?)",
+                (int(chat_id), username or "", timestamp, int(exported))
+            )
+        return cursor.rowcount == 1
+    finally:
+        conn.close()
+
+def import_exported_subscribers(rows):
+    """
+    Register (chat_id, username, created_at) rows that already exist in Google Sheets
+
+    Known chat IDs are only marked as exported, so they are never appended twice.
+    """
+    conn = _connect()
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT INTO subscribers (chat_id, username, created_at, exported) VALUES (?, ?, ?, 1)"
+                " ON CONFLICT(chat_id) DO UPDATE SET exported = 1",
+                [(int(chat_id), username or "", created_at) for chat_id, username, created_at in rows]
+            )
+    finally:
+        conn.close()
+
+def get_meta(key):
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT value FROM registry_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+def set_meta(key, value):
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO registry_meta (key, value) VALUES (?, ?)", (key, str(value)))
+    finally:
+        conn.close()
+
+def get_all_subscriber_ids():
+    """Return every registered chat ID."""
+    conn = _connect()
+    try:
+        return [row[0] for row in conn.execute("SELECT chat_id FROM subscribers")]
+    finally:
+        conn.close()
+
+def count_pending_exports() -> int:
+    conn = _connect()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM subscribers WHERE exported = ?", (EXPORT_PENDING,)).fetchone()[0]
+    finally:
+        conn.close()
+
+def claim_pending_exports(limit):
+    """
+    Move up to `limit` pending rows to the in-flight state and return them
+
+    Returns:
+        list: (chat_id, username, created_at) rows, oldest first
+    """
+    conn = _connect()
+    try:
+        with conn:
+            rows = conn.execute(
+                "SELECT chat_id, username, created_at FROM subscribers WHERE exported = ? ORDER BY created_at LIMIT ?",
+                (EXPORT_PENDING, int(limit))
+            ).fetchall()
+            conn.executemany(
+                "UPDATE subscribers SET exported = ? WHERE chat_id = ?",
+                [(EXPORT_INFLIGHT, row[0]) for row in rows]
+            )
+        return rows
+    finally:
+        conn.close()
+
+def get_inflight_exports():
+    """Return rows whose export outcome is unknown (e.g. crash during append_rows)."""
+    conn = _connect()
+    try:
+        return conn.execute(
+            "SELECT chat_id, username, created_at FROM subscribers WHERE exported = ?", (EXPORT_INFLIGHT,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+def _set_export_state(chat_ids, state):
+    conn = _connect()
+    try:
+        with conn:
+            conn.executemany("UPDATE subscribers SET exported = ? WHERE chat_id = ?", [(state, int(cid)) for cid in chat_ids])
+    finally:
+        conn.close()
+
+def mark_exported(chat_ids):
+    """Mark chat IDs as exported to Google Sheets."""
+    _set_export_state(chat_ids, EXPORT_DONE)
+
+def release_exports(chat_ids):
+    """Return in-flight chat IDs to the pending state."""
+    _set_export_state(chat_ids, EXPORT_PENDING)
@@ -0,0 +1,290 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+import numpy as np
+from config.app_config import logger, TOKEN_HISTORY_DIR, TOKEN_HISTORY_INTERVAL, TOKEN_HISTORY_MAX_SEGMENTS
+
+# TODO* TOKEN SNAPSHOT HISTORY (APPEND-ONLY .NPY SEGMENTS)
+# Every recorded snapshot is one segment of three files in TOKEN_HISTORY_DIR:
+#   <id>.names.npy   token names (fixed-width unicode)
+#   <id>.values.npy  float64 matrix, one row per token, one column per HISTORY_COLUMNS
+#   <id>.json        timestamp, snapshot digest and column names (written last)
+# A segment only exists once its .json is on disk, so a crash mid-write leaves
+# nothing half-visible. Segment ids sort by time and include the pid, so
+# several processes can append to the same directory.
+HISTORY_COLUMNS = ("Market Cap", "Total Volume", "Early Momentum Score", "Momentum Since")
+
+
+def snapshot_digest(names, *columns):
+    """Content hash of a token snapshot, used to tell new sheet data from a re-read."""
+    digest = hashlib.sha256("\x1f".join(names).encode("utf-8"))
+    for column in columns:
+        digest.update(np.ascontiguousarray(column, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+class HistorySegment:
+    """One recorded snapshot, values memory-mapped and indexed by token name."""
+
+    def __init__(self, segment_id, meta, names, values):
+        self.segment_id = segment_id
+        self.timestamp = meta["timestamp"]
+        self.digest = meta["digest"]
+        self.columns = tuple(meta["columns"])
+        self.values = values
+        # Last duplicate name wins, like the sheet-to-dict conversion of the engine
+        self._rows = {name: row for row, name in enumerate(names) if name}
+
+    def get(self, name):
+        """Previous values of one token as a dict, or None if it was not recorded."""
+        row = self._rows.get(name)
+        if row is None:
+            return None
+        return {column: float(value) for column, value in zip(self.columns, self.values[row])}
+
+    def lookup(self, names):
+        """
+        Previous values aligned with `names`
+
+        Returns:
+            dict: column -> float64 array (NaN where the token was not recorded)
+        """
+        rows = np.fromiter((self._rows.get(name, -1) for name in names), dtype=np.intp, count=len(names))
+        known = rows >= 0
+        result = {}
+        for position, column in enumerate(self.columns):
+            values = np.full(len(names), np.nan)
+            values[known] = self.values[rows[known], position]
+            result[column] = values
+        return result
+
+
+class TokenHistoryStore:
+    """
+    Append-only on-disk history of token snapshots.
+
+    The two newest segments are kept open. `baseline(digest)` returns the
+    segment a snapshot should be compared with: the newest one, unless the
+    snapshot itself is the newest one (same digest), in which case the one
+    before it. `segment_near(target, tolerance)` opens the segment recorded
+    closest to a point in time (e.g. 24h ago) and `coverage_start()` tells how
+    far back the history reaches. A new segment is appended at most every
+    `interval` seconds and only when the data changed; the oldest segments
+    beyond `max_segments` are deleted, so `max_segments * interval` must cover
+    the longest window looked up.
+
+    Args:
+        directory (str): Directory of the segment files
+        interval (float): Minimum seconds between two recorded snapshots
+        max_segments (int): Number of segments kept on disk
+    """
+
+    def __init__(self, directory, interval, max_segments):
+        self.directory = directory
+        self.interval = interval
+        self.max_segments = max_segments
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._latest = None
+        self._previous = None
+        self._near = None
+        self._segment_times = {}
+        self._oldest = None
+        self._appends = 0
+        self._errors = 0
+
+    def _segment_ids(self):
+        paths = glob.glob(os.path.join(self.directory, "*.json"))
+        return sorted(os.path.basename(path)[:-len(".json")] for path in paths)
+
+    @staticmethod
+    def _segment_time(segment_id):
+        """Unix time encoded in a segment id (millisecond precision)."""
+        return int(segment_id.split("-", 1)[0]) / 1000
+
+    def _path(self, segment_id, suffix):
+        return os.path.join(self.directory, segment_id + suffix)
+
+    def _open_segment(self, segment_id):
+        with open(self._path(segment_id, ".json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        names = np.load(self._path(segment_id, ".names.npy"), allow_pickle=False).tolist()
+        values = np.load(self._path(segment_id, ".values.npy"), mmap_mode="r", allow_pickle=False)
+        return HistorySegment(segment_id, meta, names, values)
+
+    def _index(self, segment_ids):
+        """Remember the time of every segment on disk and the exact time of the oldest one."""
+        times = {}
+        for segment_id in segment_ids:
+            try:
+                times[segment_id] = self._segment_time(segment_id)
+            except ValueError:
+                continue
+        self._segment_times = times
+        oldest_id = min(times) if times else None
+        if oldest_id is None:
+            self._oldest = None
+        elif self._oldest is None or self._oldest[0] != oldest_id:
+            try:
+                with open(self._path(oldest_id, ".json"), encoding="utf-8") as f:
+                    self._oldest = (oldest_id, json.load(f)["timestamp"])
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Error reading oldest token history segment {oldest_id}: {e}")
+                self._oldest = (oldest_id, times[oldest_id])
+
+    def _reload(self):
+        """Open the two newest segments on disk (they may come from another process)."""
+        segment_ids = self._segment_ids()
+        self._index(segment_ids)
+        opened = []
+        for segment_id in reversed(segment_ids):
+            if len(opened) == 2:
+                break
+            current = [s for s in (self._latest, self._previous) if s is not None and s.segment_id == segment_id]
+            try:
+                opened.append(current[0] if current else self._open_segment(segment_id))
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Skipping unreadable token history segment {segment_id}: {e}")
+        self._latest = opened[0] if opened else None
+        self._previous = opened[1] if len(opened) > 1 else None
+        self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            try:
+                self._reload()
+            except OSError as e:
+                self._errors += 1
+                logger.error(f"Error loading token history: {e}")
+                self._loaded = True
+
+    def baseline(self, digest):
+        """Return the segment to compare a snapshot with `digest` against, or None."""
+        with self._lock:
+            self._ensure_loaded()
+            if self._latest is not None and self._latest.digest == digest:
+                return self._previous
+            return self._latest
+
+    def segment_near(self, target, tolerance):
+        """
+        Return the segment recorded closest to `target`
+
+        Args:
+            target (float): Unix time to look up (e.g. now - 24h)
+            tolerance (float): Maximum distance in seconds between the segment and `target`
+        Returns:
+            HistorySegment: The closest segment, or None if none is within `tolerance`
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if not self._segment_times:
+                return None
+            segment_id = min(self._segment_times, key=lambda s: abs(self._segment_times[s] - target))
+            if abs(self._segment_times[segment_id] - target) > tolerance:
+                return None
+            for segment in (self._latest, self._previous, self._near):
+                if segment is not None and segment.segment_id == segment_id:
+                    return segment
+            try:
+                self._near = self._open_segment(segment_id)
+            except (OSError, ValueError, KeyError) as e:
+                # Pruned by another process since the last reload
+                logger.error(f"Error opening token history segment {segment_id}: {e}")
+                return None
+            return self._near
+
+    def coverage_start(self):
+        """Unix time of the oldest recorded snapshot, or None without history."""
+        with self._lock:
+            self._ensure_loaded()
+            return None if self._oldest is None else self._oldest[1]
+
+    def is_due(self, digest, now=None):
+        """True if a snapshot with `digest` should be appended now."""
+        now = time.time() if now is None else now
+        with self._lock:
+            latest = self._latest
+        return latest is None or (latest.digest != digest and now - latest.timestamp >= self.interval)
+
+    def append(self, names, columns, digest, timestamp=None):
+        """
+        Record one snapshot
+
+        Args:
+            names (list): Token names, one per row
+            columns (dict): column name -> float array aligned with `names`
+            digest (str): `snapshot_digest` of the snapshot
+            timestamp (float): Unix time of the snapshot (default now)
+        Returns:
+            bool: True if a segment was written
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        column_names = tuple(name for name in HISTORY_COLUMNS if name in columns)
+        values = np.column_stack([np.asarray(columns[name], dtype=np.float64) for name in column_names]) if names else np.empty((0, len(column_names)))
+
+        with self._lock:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                # Another process may have recorded the same data in the meantime
+                self._reload()
+                latest = self._latest
+                if latest is not None and (latest.digest == digest or timestamp - latest.timestamp < self.interval):
+                    return False
+
+                segment_id = f"{int(timestamp * 1000):013d}-{os.getpid()}"
+                self._write_array(self._path(segment_id, ".names.npy"), np.array(names, dtype=str))
+                self._write_array(self._path(segment_id, ".values.npy"), values)
+                meta = {"timestamp": timestamp, "digest": digest, "columns": list(column_names), "rows": len(names)}
+                self._write_file(self._path(segment_id, ".json"), json.dumps(meta).encode("utf-8"))
+
+                self._previous, self._latest = latest, self._open_segment(segment_id)
+                self._appends += 1
+                self._prune()
+                self._index(self._segment_ids())
+                return True
+            except OSError as e:
+                self._errors += 1
+                logger.error(f"Error appending token history segment: {e}")
+                return False
+
+    def _write_array(self, path, array):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array, allow_pickle=False)
+        os.replace(tmp_path, path)
+
+    def _write_file(self, path, data):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _prune(self):
+        """Delete the oldest segments beyond `max_segments` (metadata first)."""
+        segment_ids = self._segment_ids()
+        for segment_id in segment_ids[:max(0, len(segment_ids) - self.max_segments)]:
+            for suffix in (".json", ".names.npy", ".values.npy"):
+                try:
+                    os.remove(self._path(segment_id, suffix))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        """Return counters and the age of the newest segment."""
+        with self._lock:
+            latest = self._latest
+            return {
+                "appends": self._appends,
+                "errors": self._errors,
+                "segments": len(self._segment_times),
+                "latest_age": None if latest is None else time.time() - latest.timestamp,
+                "latest_rows": None if latest is None else len(latest.values),
+                "coverage": None if self._oldest is None else time.time() - self._oldest[1],
+            }
+
+
+token_history = TokenHistoryStore(TOKEN_HISTORY_DIR, TOKEN_HISTORY_INTERVAL, TOKEN_HISTORY_MAX_SEGMENTS)
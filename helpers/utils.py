@@ -1,4 +1,6 @@
-from babel.numbers import format_currency
+import numpy as np
+from babel.numbers import format_currency as babel_format_currency
+from config.app_config import logger
 
 # TODO* SPLIT TEXT FOR TELEGRAM MESSAGES
 def split_text(text, max_length=4096):
@@ -7,7 +9,7 @@ def split_text(text, max_length=4096):
 
 # TODO* FORMAT CURRENCY VALUE TO USD
 def format_to_usd(value):
-    return format_currency(value, 'USD', locale='en_US')
+    return babel_format_currency(value, 'USD', locale='en_US')
 
 """
 Module untuk fungsi-fungsi utilitas yang digunakan dalam analisis token.
@@ -51,9 +53,68 @@ def parse_float(s):
         # Default for any other case
         return 0.0
     except Exception as e:
-        print(f"Error parsing value '{s}': {e}")
+        logger.debug(f"Error parsing value '{s}': {e}")
         return 0.0
 
+_PLAIN_CELL_TYPES = {str, int, float}
+
+def parse_float_column(cells):
+    """Bulk counterpart of `parse_float` for a whole sheet column.
+
+    A column of plain numbers (native or numeric strings, no "$", "," or "%")
+    is converted by numpy in a single call. Anything else falls back to one
+    tight pass over the column: no per-cell function call, blank and
+    malformed cells take the exception path only. Values are identical to
+    `[parse_float(c) for c in cells]`, but malformed cells are counted instead
+    of logged.
+
+    Args:
+        cells (list): Raw cell values (str, int, float, None, ...)
+
+    Returns:
+        tuple: (values, valid, errors) where `values` is a float64 array (0.0 for
+            blank or invalid cells), `valid` is a bool mask of the cells that held
+            a number and `errors` counts the non-blank cells that failed to parse
+    """
+    # Clean column: numpy parses numeric strings exactly like float(). Other
+    # cell types are excluded because numpy reads None as NaN
+    if set(map(type, cells)) <= _PLAIN_CELL_TYPES:
+        try:
+            values = np.array(cells, dtype=np.float64)
+            return values, np.ones(len(values), dtype=bool), 0
+        except (ValueError, OverflowError):
+            pass
+
+    parsed = []
+    flags = []
+    errors = 0
+
+    for cell in cells:
+        if isinstance(cell, str):
+            cleaned = cell.replace('$', '').replace(',', '').replace('%', '')
+            # Handle negative values with parentheses e.g. "(123.45)"
+            if cleaned[:1] == '(' and cleaned[-1:] == ')':
+                cleaned = '-' + cleaned[1:-1]
+            try:
+                parsed.append(float(cleaned))
+                flags.append(True)
+                continue
+            except ValueError:
+                if cleaned.strip():
+                    errors += 1
+        elif isinstance(cell, (int, float)):
+            try:
+                parsed.append(float(cell))
+                flags.append(True)
+                continue
+            except OverflowError:
+                errors += 1
+
+        parsed.append(0.0)
+        flags.append(False)
+
+    return np.array(parsed, dtype=np.float64), np.array(flags, dtype=bool), errors
+
 def categorize_market_cap(market_cap):
     """Mengkategorikan token berdasarkan market cap.
     
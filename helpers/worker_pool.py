@@ -0,0 +1,132 @@
+import functools
+import os
+import queue
+import threading
+from config.app_config import logger, BACKGROUND_THREADS
+
+# TODO* BACKGROUND THREAD SUPPORT
+@functools.lru_cache(maxsize=None)
+def background_threads_enabled():
+    """
+    True if daemon threads can be relied on to run outside a request.
+
+    uWSGI started without `enable-threads` (or `threads`), like a default
+    PythonAnywhere web app, never schedules threads the app starts, so jobs
+    handed to them would be acknowledged but never run. BACKGROUND_THREADS
+    ("on"/"off") overrides the detection.
+    """
+    if BACKGROUND_THREADS in ("on", "true", "1"):
+        return True
+    if BACKGROUND_THREADS in ("off", "false", "0"):
+        return False
+
+    try:
+        import uwsgi
+    except ImportError:
+        return True
+
+    options = getattr(uwsgi, "opt", {})
+    threads = options.get("threads") or options.get(b"threads") or 0
+    try:
+        threads = int(threads)
+    except (TypeError, ValueError):
+        threads = 1
+    enabled = bool(options.get("enable-threads") or options.get(b"enable-threads")) or threads > 0
+    if not enabled:
+        logger.warning("uWSGI runs without enable-threads, background jobs run synchronously")
+    return enabled
+
+# TODO* BOUNDED WORKER LANE
+class WorkerLane:
+    """
+    Bounded job queue served by a fixed number of daemon worker threads.
+
+    Worker threads are started lazily on the first submit (and again after a
+    fork), so importing a module that defines a lane is safe in pre-forking
+    WSGI servers. Where background threads do not run (see
+    `background_threads_enabled`), jobs run synchronously in `submit`.
+
+    Args:
+        name (str): Lane name used in thread names, logs and stats
+        workers (int): Number of worker threads
+        queue_size (int): Maximum number of pending jobs
+    """
+
+    def __init__(self, name, workers, queue_size):
+        self.name = name
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._busy = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Enqueue a job without blocking (or run it now without background threads)
+
+        Returns:
+            bool: False if the lane is full and the job was rejected
+        """
+        if not background_threads_enabled():
+            self._execute(fn, args, kwargs)
+            return True
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((fn, args, kwargs))
+            return True
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            logger.warning(f"Worker lane '{self.name}' is full, rejecting job")
+            return False
+
+    def stats(self):
+        """Return queue depth and job counters of the lane."""
+        with self._lock:
+            return {
+                "name": self.name,
+                "workers": self.workers,
+                "queued": self._queue.qsize(),
+                "busy": self._busy,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+            }
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            for i in range(self.workers):
+                threading.Thread(target=self._run, name=f"{self.name}-worker-{i}", daemon=True).start()
+            self._pid = os.getpid()
+            logger.info(f"Started {self.workers} workers for lane '{self.name}'")
+
+    def _execute(self, fn, args, kwargs):
+        with self._lock:
+            self._busy += 1
+        try:
+            fn(*args, **kwargs)
+            with self._lock:
+                self._completed += 1
+        except Exception as e:
+            logger.error(f"Error in worker lane '{self.name}': {e}")
+            with self._lock:
+                self._failed += 1
+        finally:
+            with self._lock:
+                self._busy -= 1
+
+    def _run(self):
+        while True:
+            fn, args, kwargs = self._queue.get()
+            try:
+                self._execute(fn, args, kwargs)
+            finally:
+                self._queue.task_done()
@@ -1,17 +1,53 @@
 import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, CallbackContext
-from analysis.macro import analyze_macro_news
+from telegram.ext import Application, ApplicationHandlerStop, CommandHandler, MessageHandler, TypeHandler, filters, CallbackContext
+from analysis.macro import analyze_macro_news_async
 from analysis.sector import analyze_sector
-from helpers.api_helpers import save_id_to_google_sheets
+from helpers.api_helpers import save_id_to_google_sheets, start_sheets_exporter
+from helpers.rate_limit import command_rate_limiter, llm_command_slots
 from config.app_config import (
     logger, TELEGRAM_BOT_TOKEN, MINI_APP_URL, WELCOME_IMAGE_PATH,
     WELCOME_MESSAGE, HELP_MESSAGE, TOKEN_MESSAGE, INFO_MESSAGE,
-    CONTACT_MESSAGE, MACRO_MESSAGE
+    CONTACT_MESSAGE, MACRO_MESSAGE, BUSY_MESSAGE, POLLING_CONCURRENT_UPDATES, POLLING_BLOCKING_WORKERS
 )
 
-# Initialize bot application
-bot = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+# Initialize bot application, processing up to POLLING_CONCURRENT_UPDATES updates at once
+bot = Application.builder().token(TELEGRAM_BOT_TOKEN).concurrent_updates(POLLING_CONCURRENT_UPDATES).build()
+
+# Blocking calls (Gemini, Sheets, registry) run in this bounded pool, so a slow
+# /macro or /sector never blocks the event loop serving the other chats
+blocking_executor = ThreadPoolExecutor(max_workers=POLLING_BLOCKING_WORKERS, thread_name_prefix="polling-blocking")
+
+async def run_blocking(fn, *args):
+    """Run a blocking call in `blocking_executor` and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, contextvars.copy_context().run, fn, *args)
+
+# Admission control, runs before every other handler (group -1)
+async def admit_chat(update: Update, context: CallbackContext):
+    """
+    Per-chat rate limit on commands and button callbacks (plain text is not
+    counted, like the webhook), a throttled chat gets at most one busy notice
+    per interval.
+    """
+    callback_query = update.callback_query
+    if callback_query is None and not (update.message and (update.message.text or "").startswith("/")):
+        return
+
+    # Callbacks from inline messages carry no chat, fall back to the user
+    chat, user = update.effective_chat, update.effective_user
+    chat_id = chat.id if chat is not None else (user.id if user is not None else None)
+    if chat_id is None:
+        return
+
+    if not command_rate_limiter.allow(chat_id):
+        if callback_query is not None:
+            await callback_query.answer(BUSY_MESSAGE)
+        elif command_rate_limiter.should_notify(chat_id):
+            await update.message.reply_text(BUSY_MESSAGE)
+        raise ApplicationHandlerStop
 
 # Command handlers
 async def start(update: Update, context: CallbackContext):
@@ -36,7 +72,7 @@ async def start(update: Update, context: CallbackContext):
             # Save user ID after welcome start
             chat_id = update.message.chat_id
             username = update.message.chat.username
-            save_id_to_google_sheets(chat_id, username)
+            await run_blocking(save_id_to_google_sheets, chat_id, username)
 
     except FileNotFoundError:
         logger.error(f"Welcome image not found at {WELCOME_IMAGE_PATH}")
@@ -47,6 +83,15 @@ async def start(update: Update, context: CallbackContext):
 
 async def handle_analyze(update: Update, context: CallbackContext):
     user_message = update.message.text.strip()
+    if "/sector" not in user_message and "/macro" not in user_message:
+        return
+
+    # Shed LLM commands beyond the global and per-chat caps instead of queueing them
+    chat_id = update.effective_chat.id
+    if not llm_command_slots.try_acquire(chat_id):
+        await update.message.reply_text(BUSY_MESSAGE)
+        return
+
     try:
         if "/sector" in user_message:
             await update.message.reply_text("Analyzing...")
@@ -54,7 +99,7 @@ async def handle_analyze(update: Update, context: CallbackContext):
             # Remove the "/sector" prefix from the user message
             clean_query = user_message.replace("/sector", "", 1).strip()
 
-            analysis_result = analyze_sector(clean_query)
+            analysis_result = await run_blocking(analyze_sector, clean_query)
             
             await update.message.reply_text(analysis_result)
         
@@ -64,13 +109,15 @@ async def handle_analyze(update: Update, context: CallbackContext):
             # Remove the "/macro" prefix from the user message
             clean_query = user_message.replace("/macro", "", 1).strip()
             
-            analysis_result = analyze_macro_news(clean_query)
+            analysis_result = await analyze_macro_news_async(clean_query, executor=blocking_executor)
             
             await update.message.reply_text(analysis_result)
 
     except Exception as e:
         logger.error(f"Error while handling message: {e}")
         await update.message.reply_text("Error occurred while processing request. Try again later.")
+    finally:
+        llm_command_slots.release(chat_id)
 
 async def token(update: Update, context: CallbackContext):
     logger.info(f"User {update.effective_user.id} requested token info")
@@ -94,8 +141,10 @@ async def macro(update: Update, context: CallbackContext):
 
 def setup_handlers():
     # Add handlers to the application
+    bot.add_handler(TypeHandler(Update, admit_chat), group=-1)
     bot.add_handler(CommandHandler("start", start))
     bot.add_handler(CommandHandler("sector", handle_analyze))
+    bot.add_handler(CommandHandler("macro", handle_analyze))
     bot.add_handler(CommandHandler("token", token))
     bot.add_handler(CommandHandler("help", help))
     bot.add_handler(CommandHandler("info", info))
@@ -106,18 +155,22 @@ async def run_polling():
     """Run the bot with polling method"""
     logger.info("Starting bot with polling method...")
     
-    # Initialize the bot
-    await bot.initialize()
-    
-    # Start polling
-    await bot.start_polling()
-    
-    # Run the bot until the user presses Ctrl-C
-    await bot.idle()
+    # Initialize the bot and start polling
+    async with bot:
+        await bot.start()
+        await bot.updater.start_polling()
+        try:
+            # Run the bot until the user presses Ctrl-C
+            await asyncio.Event().wait()
+        finally:
+            await bot.updater.stop()
+            await bot.stop()
 
 def start_polling():
     """Start the bot with polling method"""
     setup_handlers()
+    # Export users spooled before a restart without waiting for a new registration
+    start_sheets_exporter()
     try:
         asyncio.run(run_polling())
     except (KeyboardInterrupt, SystemExit):
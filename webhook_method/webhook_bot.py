@@ -1,31 +1,178 @@
 import requests
 import asyncio
 import json
+import os
 from flask import Flask, request, Response
 from analysis.sector import analyze_sector
 from analysis.macro import analyze_macro_news
-from analysis.token import format_category_tokens
+from analysis.token import format_category_page, parse_page_callback, start_report_scheduler, MOMENTUM_PAGE_SIZE
 from helpers.api_helpers import (
-    broadcast_message_tg, get_all_chat_ids_from_sheets, save_id_to_google_sheets, reply_message_tg, delete_message_tg
+    broadcast_message_tg, get_all_chat_ids_from_sheets, save_id_to_google_sheets, reply_message_tg,
+    answer_callback_query_tg, start_sheets_exporter
 )
+from helpers.worker_pool import WorkerLane
+from helpers.message_stream import ProgressiveMessage
+from helpers.rate_limit import command_rate_limiter, llm_command_slots
+from helpers.metrics import track_command, command_requests, render_prometheus, PROMETHEUS_CONTENT_TYPE
 from config.app_config import (
     logger, TELEGRAM_BOT_TOKEN, WEBHOOK_URL,
     WELCOME_MESSAGE, HELP_MESSAGE, TOKEN_MESSAGE, INFO_MESSAGE,
-    CONTACT_MESSAGE
+    CONTACT_MESSAGE, BUSY_MESSAGE,
+    WEBHOOK_FAST_WORKERS, WEBHOOK_SLOW_WORKERS, WEBHOOK_QUEUE_SIZE
 )
 
 # Create Flask app
 app = Flask(__name__)
 
 
+# Cheap static-reply commands get their own lane so they never wait behind LLM jobs
+FAST_COMMANDS = ('/start', '/help', '/info', '/contact', '/token')
+fast_lane = WorkerLane("fast", WEBHOOK_FAST_WORKERS, WEBHOOK_QUEUE_SIZE)
+slow_lane = WorkerLane("slow", WEBHOOK_SLOW_WORKERS, WEBHOOK_QUEUE_SIZE)
+# Broadcasts run for minutes: one at a time, on a lane of their own so they
+# never hold a slow-lane worker that momentum commands and callbacks rely on
+broadcast_lane = WorkerLane("broadcast", 1, 1)
+
+# LLM-backed commands, admitted only while an LLM slot is free
+LLM_COMMANDS = ('/sector', '/macro')
+
+# Commands used as metric labels, anything else is reported as "other"
+KNOWN_COMMANDS = FAST_COMMANDS + ('/largecap', '/midcap', '/smallcap', '/microcap') + LLM_COMMANDS
+
+def command_name(text):
+    """Metric label of a command message ("/macro@bot what now" -> "/macro")."""
+    command = text.split(maxsplit=1)[0].split('@', 1)[0] if text else ''
+    return command if command in KNOWN_COMMANDS else 'other'
+
+def admit_chat(chat_id):
+    """Per-chat rate limit, a throttled chat gets at most one busy notice per interval."""
+    if command_rate_limiter.allow(chat_id):
+        return True
+    if command_rate_limiter.should_notify(chat_id):
+        reply_message_tg(chat_id, BUSY_MESSAGE)
+    return False
+
+def page_cursor(text):
+    """Rank offset of the page asked for in a category command ("/largecap 2" -> 15)."""
+    parts = text.split()
+    page = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 1
+    return (max(page, 1) - 1) * MOMENTUM_PAGE_SIZE
+
+def send_category_page(chat_id, category_name, cursor=0, ranking_id=None):
+    """Reply with one page of a category ranking, plus a "next page" button if there is one."""
+    momentum_report, next_page = format_category_page(category_name, cursor, ranking_id)
+    reply_markup = None
+    if next_page:
+        reply_markup = {"inline_keyboard": [[{"text": "Next page ▶️", "callback_data": next_page}]]}
+    reply_message_tg(chat_id, momentum_report, reply_markup=reply_markup)
+
+
+# *BACKGROUND JOBS
+# Started by start_webhook, and on the first request of each process under WSGI
+# (wsgi_pythonanywhere.py never calls start_webhook), so rows spooled before a
+# restart are exported without waiting for a new registration
+_jobs_pid = None
+
+@app.before_request
+def start_background_jobs():
+    """Start the report scheduler and the Google Sheets exporter once per process."""
+    global _jobs_pid
+    if _jobs_pid == os.getpid():
+        return
+    _jobs_pid = os.getpid()
+    start_report_scheduler()
+    start_sheets_exporter()
+
+
 # *WEBHOOK ROUTE
 @app.route('/webhook', methods=['POST'])
 def webhook():
+    """Validate and enqueue the update, then acknowledge Telegram right away."""
     try:
         # Get the update from Telegram
-        update_json = request.get_json(force=True)
+        update_json = request.get_json(force=True, silent=True)
         logger.info(f"Received update: {update_json}")
 
+        # Inline "next page" buttons of the category commands
+        callback_query = update_json.get('callback_query') if isinstance(update_json, dict) else None
+        if callback_query and 'id' in callback_query:
+            # Callbacks from inline messages carry no chat, fall back to the user
+            chat_id = (callback_query.get('message') or {}).get('chat', {}).get('id')
+            if chat_id is None:
+                chat_id = (callback_query.get('from') or {}).get('id')
+            admitted = chat_id is None or command_rate_limiter.allow(chat_id)
+            if not admitted or not slow_lane.submit(handle_callback_query, callback_query):
+                command_requests.inc(command='callback_query', outcome='shed')
+                answer_callback_query_tg(callback_query['id'], BUSY_MESSAGE)
+            return Response('OK', status=200)
+
+        # Only text commands are handled, acknowledge everything else immediately
+        message = update_json.get('message') if isinstance(update_json, dict) else None
+        if not message or 'id' not in message.get('chat', {}):
+            return Response('OK', status=200)
+
+        text = message.get('text', '')
+        if not text.startswith('/'):
+            return Response('OK', status=200)
+
+        # Admission control: shed excess load with a fast busy reply, before it
+        # takes a worker, so well-behaved chats keep their latency under abuse
+        chat_id = message['chat']['id']
+        if not admit_chat(chat_id):
+            command_requests.inc(command=command_name(text), outcome='rate_limited')
+            return Response('OK', status=200)
+
+        # The LLM slot (one per chat) is held while the command is queued and while it runs
+        llm_command = text.startswith(LLM_COMMANDS)
+        if llm_command and not llm_command_slots.try_acquire(chat_id):
+            command_requests.inc(command=command_name(text), outcome='shed')
+            if command_rate_limiter.should_notify(chat_id):
+                reply_message_tg(chat_id, BUSY_MESSAGE)
+            return Response('OK', status=200)
+
+        lane = fast_lane if text.startswith(FAST_COMMANDS) else slow_lane
+        if not lane.submit(handle_llm_update if llm_command else handle_update, update_json):
+            if llm_command:
+                llm_command_slots.release(chat_id)
+            command_requests.inc(command=command_name(text), outcome='shed')
+            if command_rate_limiter.should_notify(chat_id):
+                reply_message_tg(chat_id, BUSY_MESSAGE)
+
+        return Response('OK', status=200)
+    except Exception as e:
+        logger.error(f"Error processing update webhook: {e}")
+        return Response('OK', status=200)  # Still return 200 to avoid Telegram retries
+
+# *HANDLE UPDATE (runs in a worker lane)
+def handle_update(update_json):
+    text = (update_json.get('message') or {}).get('text', '')
+    with track_command(command_name(text)):
+        dispatch_update(update_json)
+
+def handle_llm_update(update_json):
+    try:
+        handle_update(update_json)
+    finally:
+        llm_command_slots.release(update_json['message']['chat']['id'])
+
+# *HANDLE CALLBACK QUERY (runs in the slow lane)
+def handle_callback_query(callback_query):
+    with track_command('callback_query'):
+        try:
+            answer_callback_query_tg(callback_query['id'])
+
+            page = parse_page_callback(callback_query.get('data'))
+            chat_id = (callback_query.get('message') or {}).get('chat', {}).get('id')
+            if page is None or chat_id is None:
+                return
+
+            category_name, ranking_id, cursor = page
+            send_category_page(chat_id, category_name, cursor, ranking_id)
+        except Exception as e:
+            logger.error(f"Error processing callback query {callback_query.get('id')}: {e}")
+
+def dispatch_update(update_json):
+    try:
         # Extract basic information from the update
         if 'message' in update_json:
 
@@ -77,38 +224,26 @@ def webhook():
                 # TODO* LARGECAP COMMAND
                 elif text.startswith('/largecap'):
                   
-                    # Then generate momentum report
-                    momentum_report = format_category_tokens("largeCap")
-
-                    # Reply the analysis result
-                    reply_message_tg(chat_id, momentum_report)
+                    # Then generate momentum report ("/largecap 2" for the next page)
+                    send_category_page(chat_id, "largeCap", page_cursor(text))
                 
                 # TODO* MIDCAP COMMAND
                 elif text.startswith('/midcap'):
                     
-                    # generate momentum report
-                    momentum_report = format_category_tokens("midCap")
-
-                    # Reply the analysis result
-                    reply_message_tg(chat_id, momentum_report)
+                    # generate momentum report ("/midcap 2" for the next page)
+                    send_category_page(chat_id, "midCap", page_cursor(text))
                 
                 # TODO* SMALLCAP COMMAND
                 elif text.startswith('/smallcap'):
                 
-                    # generate momentum report
-                    momentum_report = format_category_tokens("smallCap")
-
-                    # Reply the analysis result
-                    reply_message_tg(chat_id, momentum_report)
+                    # generate momentum report ("/smallcap 2" for the next page)
+                    send_category_page(chat_id, "smallCap", page_cursor(text))
                 
                 # TODO* MICROCAP COMMAND
                 elif text.startswith('/microcap'):
                     
-                    # Then generate momentum report
-                    momentum_report = format_category_tokens("microCap")
-
-                    # Reply the analysis result
-                    reply_message_tg(chat_id, momentum_report)
+                    # Then generate momentum report ("/microcap 2" for the next page)
+                    send_category_page(chat_id, "microCap", page_cursor(text))
 
                 # TODO* SECTOR COMMAND
                 elif text.startswith('/sector'):
@@ -119,15 +254,12 @@ def webhook():
                     # Remove the "/sector" prefix from the user message
                     clean_query_sector = text.replace("/sector", "", 1).strip()
 
-                    # Then analyze sector
-                    sector_analysis_result = analyze_sector(clean_query_sector)
-                    
-                    if msg_id is not None:
-                        # Delete the initial response
-                        delete_message_tg(chat_id, msg_id)
+                    # Then analyze sector, streaming the answer into the initial response
+                    progressive_reply = ProgressiveMessage(chat_id, msg_id)
+                    sector_analysis_result = analyze_sector(clean_query_sector, on_chunk=progressive_reply.update)
 
-                    # Reply the analysis result
-                    reply_message_tg(chat_id, sector_analysis_result)
+                    # Render the final analysis result
+                    progressive_reply.finish(sector_analysis_result)
 
 
                 # TODO* MACRO COMMAND
@@ -139,22 +271,23 @@ def webhook():
                     # Remove the "/macro" prefix from the user message
                     clean_query_macro = text.replace("/macro", "", 1).strip()
 
-                    # Then analyze Macro News
-                    macro_analysis_result = analyze_macro_news(clean_query_macro)
+                    # Then analyze Macro News, streaming the answer into the initial response
+                    progressive_reply = ProgressiveMessage(chat_id, msg_id)
+                    macro_analysis_result = analyze_macro_news(clean_query_macro, on_chunk=progressive_reply.update)
 
-                    if msg_id is not None:
-                        # Delete the initial response
-                        delete_message_tg(chat_id, msg_id)
-
-                    # Reply the analysis result
-                    reply_message_tg(chat_id, macro_analysis_result)
+                    # Render the final analysis result
+                    progressive_reply.finish(macro_analysis_result)
                 
 
         logger.info("Telegram message sent successfully")
-        return Response('OK', status=200)
     except Exception as e:
-        logger.error(f"Error processing update webhook: {e}")
-        return Response('OK', status=200)  # Still return 200 to avoid Telegram retries
+        logger.error(f"Error processing update {update_json.get('update_id')}: {e}")
+
+# TODO* METRICS
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Latency histograms and counters in Prometheus text format."""
+    return Response(render_prometheus(), status=200, content_type=PROMETHEUS_CONTENT_TYPE)
 
 # TODO* SET WEBHOOK
 @app.route('/set_webhook', methods=['GET'])
@@ -196,26 +329,39 @@ def trigger_macro_notification():
         if not data or data.get("key") != "macro":
             return Response("Unauthorized", status=403)
         
+        # The LLM call and the broadcast take minutes, run them off the request
+        if not broadcast_lane.submit(run_macro_broadcast):
+            command_requests.inc(command='/trigger_macro', outcome='shed')
+            return Response("Busy, try again later", status=503)
+
+        return Response('Accepted', status=202)
+    except Exception as e:
+        logger.error(f"Error in trigger_macro_notification: {e}")
+        return Response(f"Error processing macro notification: {str(e)}", status=500)        
+
+# *MACRO BROADCAST (runs in the broadcast lane)
+def run_macro_broadcast():
+    with track_command('/trigger_macro'):
         macro_analysis_result = analyze_macro_news()
-        
+
         all_chat_ids = get_all_chat_ids_from_sheets()
         if not all_chat_ids:
             logger.warning("No chat IDs found to broadcast to")
-            return Response("No recipients found", status=200)
-        
-        broadcast_message_tg(all_chat_ids, macro_analysis_result)
-        
-        logger.info("Macro analysis broadcasted successfully")
-        return Response('OK', status=200)
-    except Exception as e:
-        logger.error(f"Error in trigger_macro_notification: {e}")
-        return Response(f"Error processing macro notification: {str(e)}", status=500)        
+            return
+
+        report = broadcast_message_tg(all_chat_ids, macro_analysis_result)
+
+    if report["failed"]:
+        logger.warning(f"Macro analysis broadcast: {report['sent']} sent, {report['failed']} failed in {report['elapsed']:.1f}s")
+    else:
+        logger.info(f"Macro analysis broadcasted successfully: {report['sent']} sent in {report['elapsed']:.1f}s")
 
 
 # TODO* START WEBHOOK
 def start_webhook(host='0.0.0.0', port=5000, debug=False):
     """Start the Flask app for webhook"""
     logger.info(f"Starting webhook server on {host}:{port}")
+    start_background_jobs()
     app.run(host=host, port=port, debug=debug)
 
 if __name__ == "__main__":
@@ -5,6 +5,11 @@ project_home = '/home/gafarybyh/elephant_agent_bot'
 if project_home not in sys.path:
     sys.path = [project_home] + sys.path
 
+# Webhook commands, report refreshes and the Google Sheets export run on
+# background threads, which uWSGI only schedules with `enable-threads = true`
+# (or `threads = N`). Without it (the PythonAnywhere default) they run
+# synchronously in the request instead, see BACKGROUND_THREADS in env.example.
+
 # Import aplikasi Flask dari webhook_bot.py
 from webhook_method.webhook_bot import app as application
 